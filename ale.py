@@ -1,7 +1,21 @@
+import concurrent.futures
 import csv
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+import locale
+import mmap
+import multiprocessing
 import os
 import re
+import shutil
+import sys
+import threading
+import zipfile
 
+import numpy
 import pandas
 import timecode
 
@@ -11,37 +25,121 @@ __version__ = "1.2.0"
 
 # v1.2.0 - added support for ALEs from OSD with no blank lines
 
+DYNAMIC_TAG_PATTERN = re.compile(r'{[a-zA-Z0-9 _-]+}')
+
+# in compact mode, columns with at most this fraction of distinct values per row are stored as categoricals
+COMPACT_CATEGORY_RATIO = 0.5
+
+# rows per chunk when streaming ALEs too large to load in one go
+CHUNK_ROWS = 50000
+
+# printing an ALE only shows the first and last rows and columns beyond these sizes
+REPR_MAX_ROWS = 60
+REPR_MAX_COLUMNS = 20
+
+# on disk parse cache settings, bump the version whenever the parsed format changes
+PARSE_CACHE_VERSION = 2
+PARSE_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+PARSE_CACHE_ENVIRONMENT = 'ALE_PARSE_CACHE'
+PARSE_CACHE_SIZE_ENVIRONMENT = 'ALE_PARSE_CACHE_BYTES'
+
+# columns that identify a clip, used to match rows in merge and for the key index
+KEY_COLUMNS = ("Tape", "Start")
+
+# section markers, matched against the raw bytes of a memory mapped file
+COLUMN_MARKER_PATTERN = re.compile(rb'^[ \t]*Column[ \t\r]*$', re.MULTILINE)
+DATA_MARKER_PATTERN = re.compile(rb'^[ \t]*Data[ \t\r]*$', re.MULTILINE)
+
+TIMECODE_PATTERN = re.compile(r'^\s*(\d+):(\d+):(\d+)[:;](\d+)\s*$')
+
 
 class Ale:
 
-    def __init__(self, filename: str = None):
+    def __init__(self, filename: str = None, compact=False, usecols=None, lazy=False):
 
         self.name = "Empty"
         self.filename = ""
 
         self.heading = {}
 
-        self.dataframe = pandas.DataFrame()
+        # the result of a lazy append or merge that hasn't been built yet, see the dataframe property
+        self._deferred = None
+        self._dataframe = pandas.DataFrame()
+
+        # store low cardinality columns as categoricals and the rest as Arrow backed strings, see compact_dataframe
+        self.compact = compact
+
+        # append and merge results are only built when their data is first used
+        self.lazy = lazy
+
+        # key tuple: list of row positions, built when first used by lookup, upsert or delete
+        self.key_columns = list(KEY_COLUMNS)
+        self._key_index = None
+        self._key_index_rows = 0
 
         if filename:
-            self.load_from_file(filename)
+            self.load_from_file(filename, usecols)
 
     def __repr__(self):
 
-        to_return = os.path.basename(self.filename) + '\n'
+        return self.to_string()
+
+    def __getstate__(self):
+
+        # deferred results can't be pickled, so they're built before the ALE is sent to another process
+        state = self.__dict__.copy()
+        state['_dataframe'], state['_deferred'] = self.dataframe, None
+
+        return state
+
+    @property
+    def dataframe(self):
 
-        for index, value in self.heading.items():
-            to_return = to_return + f'{index}\t{value}\n'
+        if self._deferred is not None:
+            # a shallow copy, so changes made through this ALE don't reach other ALEs sharing the deferred result
+            self._dataframe = self._deferred.materialize().copy(deep=False)
+            self._deferred = None
 
-        to_return = to_return + "\n"
+        return self._dataframe
 
-        to_return = to_return + self.dataframe.to_string(justify='justify')
+    @dataframe.setter
+    def dataframe(self, dataframe):
 
-        return to_return
+        self._dataframe = dataframe
+        self._deferred = None
+        self._key_index = None
 
-    def load_from_file(self, filename):
+    def to_string(self, max_rows=REPR_MAX_ROWS, max_columns=REPR_MAX_COLUMNS):
 
-        """load an ALE file into the ALE object"""
+        """returns the heading and data as text - large ALEs are truncated to the first and last rows and columns,
+        so only those are formatted. Pass None for max_rows and max_columns to include everything"""
+
+        data_text = self.dataframe.to_string(justify='justify', max_rows=max_rows, max_cols=max_columns,
+                                             show_dimensions='truncate')
+
+        return self._heading_text() + data_text
+
+    def preview(self, start_row=0, max_rows=100, start_column=0, max_columns=None):
+
+        """returns the heading and a window of the data as text, only the rows and columns in the window are
+        formatted"""
+
+        end_column = None if max_columns is None else start_column + max_columns
+        window = self.dataframe.iloc[start_row:start_row + max_rows, start_column:end_column]
+
+        return self._heading_text() + window.to_string(justify='justify')
+
+    def _heading_text(self):
+
+        heading_lines = [os.path.basename(self.filename)]
+        heading_lines += [f'{index}\t{value}' for index, value in self.heading.items()]
+
+        return "\n".join(heading_lines) + "\n\n"
+
+    def load_from_file(self, filename, usecols=None):
+
+        """load an ALE file into the ALE object, if usecols is given only those columns are read - columns in
+        usecols that aren't in the file are ignored"""
 
         if not os.path.isfile(filename):
             raise FileNotFoundError(f'{filename} is not a valid file')
@@ -49,63 +147,74 @@ class Ale:
         self.name = os.path.basename(filename)
         self.filename = filename
 
-        rows_to_load = []
+        # the cache holds whole files, so a partial load goes straight to the parser
+        if parse_cache and usecols is None:
+            self.heading, self.dataframe = parse_cache.load(filename, self.compact, self._parse_file)
+        else:
+            self.heading, self.dataframe = self._parse_file(filename, usecols)
 
-        with open(filename, "r") as file_handler:
+    def _parse_file(self, filename, usecols=None):
 
-            ale_fie_lines = file_handler.readlines()
+        """parses an ALE file, returns the heading dictionary and the data as a dataframe - the file is memory mapped,
+        only the heading and column line are decoded up front and the parser reads the data straight from the map"""
 
-            heading = False
+        if os.path.getsize(filename) == 0:
+            raise AleException(f'ALE Load\n{filename} is empty')
 
-            for line_index, line_content in enumerate(ale_fie_lines):
+        with open(filename, "rb") as file_handler, \
+                mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
 
-                if line_content.strip() == "":
-                    continue
+            heading, column_line, data_start = find_sections(file_map)
 
-                elif line_content.strip() == "Heading":
-                    heading = True
+            if not column_line.strip():
+                raise AleException(f'ALE Load\n{filename} has no Column section')
 
-                elif line_content.strip() == "Column":
-                    heading = False
-                    rows_to_load.append(line_index + 1)
+            column_names, positions = column_positions(column_line, usecols)
 
-                elif line_content.strip() == "Data":
-                    rows_to_load += range(line_index + 1, len(ale_fie_lines))
-                    # this is the last element we're interested in, break out of the loop
-                    break
+            file_map.seek(data_start)
 
-                elif heading:
-                    add_to_heading = line_content.strip().split(maxsplit=1)
-                    self.heading[add_to_heading[0]] = add_to_heading[1]
+            # in compact mode every column is parsed straight into a categorical, then compact_dataframe turns the
+            # ones with too many distinct values into strings
+            dataframe = read_data(file_map, column_names, positions, dtype="category" if self.compact else str,
+                                  encoding=locale.getpreferredencoding(False))
 
-            # all lines apart from rows to load
-            skip_rows = [x for x in range(0, len(ale_fie_lines)) if x not in rows_to_load]
+        dataframe = dataframe[positions]
+        dataframe.columns = column_names[positions]
 
-        self.dataframe = pandas.read_csv(filename, sep="\t", skiprows=skip_rows, dtype=str, engine="python",
-                                         keep_default_na=False)
+        if self.compact:
+            dataframe = compact_dataframe(dataframe)
 
-        self.dataframe = self.dataframe.loc[:, ~self.dataframe.columns.str.contains('^Unnamed')]
+        return heading, dataframe
 
     def append(self, other, inplace=False, return_errors=False):
 
-        """add an ALE to this one by row"""
+        """add an ALE to this one by row - in lazy mode the rows aren't concatenated until the result is used, and a
+        chain of appends is concatenated in one go"""
 
-        merged_ale = Ale()
+        merged_ale = Ale(compact=self.compact, lazy=self.lazy)
+        merged_ale.heading = other.heading if self.is_empty() else self.heading
 
-        if self.dataframe.empty:
+        if self.lazy:
+            # appending to an unbuilt append carries on its list of inputs rather than building it first
+            if self._deferred is not None and self._deferred.build is append_frames:
+                sources = self._deferred.sources + [other._source()]
+            else:
+                sources = [self._source(), other._source()]
+
+            merged_ale._defer(append_frames, sources, columns=append_columns(sources))
+
+        elif self.dataframe.empty:
             merged_ale.dataframe = other.dataframe.copy()
-            merged_ale.heading = other.heading
 
         else:
-            merged_ale.dataframe = pandas.concat([self.dataframe, other.dataframe], axis=0, ignore_index=True)
-            merged_ale.heading = self.heading
+            merged_ale.dataframe = append_frames([self.dataframe, other.dataframe])
 
         if inplace:
-            self.dataframe = merged_ale.dataframe
+            self._take_data(merged_ale)
 
         if return_errors:
-            cols_self = set(self.dataframe.columns)
-            cols_other = set(other.dataframe.columns)
+            cols_self = set(self.columns())
+            cols_other = set(other.columns())
 
             missing_from_self = cols_other - cols_self
             missing_from_other = cols_self - cols_other
@@ -117,52 +226,230 @@ class Ale:
 
     def merge(self, other, match_on=None, inplace=False, return_errors=False):
 
-        """add an ALE to this one by column"""
+        """add an ALE to this one by column, matching rows on the match_on columns (Tape and Start by default) - with
+        return_errors, returns the merged ALE along with a list of clips only in this ALE, a list of clips only in the
+        other ALE, a list of columns present in both, and a list of clips that appear more than once in either ALE.
+        In lazy mode, without return_errors, the merge isn't done until the result is used"""
 
         if match_on is None:
-            match_on = ["Tape", "Start"]
+            match_on = list(KEY_COLUMNS)
 
-        merged_ale = Ale()
+        merged_ale = Ale(compact=self.compact, lazy=self.lazy)
+        merged_ale.heading = self.heading
 
-        if self.dataframe.empty:
-            merged_ale.dataframe = other.dataframe.copy()
+        if not self.is_empty():
+            for column in match_on:
+                if column not in self.columns() or column not in other.columns():
+                    raise AleException(f'ALE Merge\n{column} is not in both ALEs')
+
+        if self.lazy and not return_errors:
+            compact = self.compact
+            merged_ale._defer(lambda frames: merge_frames(frames[0], frames[1], match_on, compact)[0],
+                              [self._source(), other._source()])
+            merge_errors = None
 
         else:
-            merged_ale.dataframe = pandas.merge(self.dataframe, other.dataframe, how="outer", on=match_on,
-                                                suffixes=("", "_2"), indicator=True)
+            merged_frame, *merge_errors = merge_frames(self.dataframe, other.dataframe, match_on, self.compact,
+                                                       return_errors)
+            merged_ale.dataframe = merged_frame
 
         if inplace:
-            self.dataframe = merged_ale.dataframe
+            self._take_data(merged_ale)
 
         if return_errors:
+            return merged_ale, *merge_errors
 
-            # check for rows that only exist in one dataframe
+        return merged_ale
 
-            diff_df = merged_ale.dataframe.loc[merged_ale.dataframe['_merge'] != 'both'].copy()
-            diff_df.reset_index(drop=True, inplace=True)
+    def is_empty(self):
 
-            diff_df["Match"] = ""
+        """whether the ALE has no rows or no columns, without building a lazy result"""
 
-            for col in match_on:
-                diff_df["Match"] = diff_df["Match"] + " " + diff_df[col]
+        return self._deferred.empty if self._deferred is not None else self._dataframe.empty
 
-            left_only = [value for index, value in enumerate(diff_df["Match"])
-                         if diff_df["_merge"][index] == "left_only"]
-            right_only = [value for index, value in enumerate(diff_df["Match"])
-                          if diff_df["_merge"][index] == "right_only"]
+    def columns(self):
 
-            # check for columns that are duplicated
+        """returns the ALE's columns, without building a lazy result where they're known in advance"""
 
-            duplicate_columns = [value.strip("_2") for value in diff_df.columns if "_2" in value]
+        if self._deferred is not None and self._deferred.columns is not None:
+            return self._deferred.columns
 
-            # Return number of mismatches,  list of items in self with no match, list of items in other with no match,
-            # list of duplicates
-            return len(diff_df), left_only, right_only, duplicate_columns
+        return list(self.dataframe.columns)
 
-        merged_ale.heading = self.heading
-        merged_ale.dataframe.drop(['_merge'], axis=1, inplace=True)
+    def _source(self):
 
-        return merged_ale
+        """returns the ALE's data as an input for a deferred result - either its own unbuilt result, or a shallow copy
+        of its dataframe, so changes made to this ALE afterwards don't reach the result"""
+
+        return self._deferred if self._deferred is not None else self._dataframe.copy(deep=False)
+
+    def _defer(self, build, sources, columns=None):
+
+        """sets the ALE's data to the result of build(list of source dataframes), built the first time it's used"""
+
+        self._dataframe = pandas.DataFrame()
+        self._deferred = DeferredFrame(build, sources, all(source.empty for source in sources), columns)
+
+    def _take_data(self, other):
+
+        """replaces this ALE's data with another ALE's, sharing it if it hasn't been built yet"""
+
+        self._dataframe, self._deferred = other._dataframe, other._deferred
+        self._key_index = None
+
+    def set_key(self, key_columns=None):
+
+        """sets the columns that identify a clip for lookup, upsert and delete - Tape and Start by default, as for
+        merge"""
+
+        self.key_columns = list(key_columns or KEY_COLUMNS)
+        self._key_index = None
+
+    def key_index(self):
+
+        """returns a dictionary of key tuple: list of row positions for the key columns, it's built on first use and
+        kept up to date by upsert - changing a key column other than through the Ale methods needs set_key calling
+        again"""
+
+        dataframe = self.dataframe
+
+        for column in self.key_columns:
+            if column not in dataframe.columns:
+                raise AleException(f'ALE Key\n{column} is not in the ALE')
+
+        if self._key_index is None or self._key_index_rows != len(dataframe):
+            key_index = {}
+
+            for position, key in enumerate(zip(*[dataframe[column].tolist() for column in self.key_columns])):
+                key_index.setdefault(key, []).append(position)
+
+            self._key_index = key_index
+            self._key_index_rows = len(dataframe)
+
+        return self._key_index
+
+    def lookup(self, key):
+
+        """returns the first clip with a key as a dictionary of column: value, or None if there isn't one - key is a
+        tuple of values for the key columns, or a single value if there's only one key column"""
+
+        positions = self.key_index().get(key_tuple(key))
+
+        if not positions:
+            return None
+
+        return self.dataframe.iloc[positions[0]].to_dict()
+
+    def lookup_rows(self, keys):
+
+        """returns every clip matching a list of keys as a dataframe, in the order of the keys"""
+
+        key_index = self.key_index()
+
+        return self.dataframe.iloc[[position for key in keys for position in key_index.get(key_tuple(key), [])]]
+
+    def upsert(self, records):
+
+        """updates the clips matching the keys of records, a dataframe or a list of dictionaries that include the key
+        columns, and adds records whose keys aren't in the ALE as new clips - only the matched rows and the columns in
+        the records are written. Values missing from a record (None or NaN) are left as they are on existing clips,
+        new columns and the missing values of new clips are empty, and other values are written as text. An ALE with
+        no clips takes its key columns from the records. Returns the number of records that updated clips and the
+        number added"""
+
+        if not isinstance(records, pandas.DataFrame):
+            # object, so a number missing from some records doesn't become a float in the others
+            records = pandas.DataFrame(records, dtype=object)
+
+        for column in self.key_columns:
+            if column not in records.columns:
+                raise AleException(f'ALE Upsert\n{column} is not in the records')
+
+        # ALE cells are text, so numbers in the records are written (and matched on) as strings
+        records = records.astype(object).map(lambda value: value if isinstance(value, str) or pandas.isna(value)
+                                             else str(value))
+
+        # a key given more than once takes its last values
+        records = records.drop_duplicates(subset=self.key_columns, keep="last")
+        record_keys = list(zip(*[records[column].tolist() for column in self.key_columns]))
+
+        if self.dataframe.empty:
+            for column in self.key_columns:
+                if column not in self._dataframe.columns:
+                    self._dataframe[column] = ""
+
+        key_index = self.key_index()
+        dataframe = self._dataframe
+
+        target_positions, record_rows, new_rows = [], [], []
+
+        for record_row, key in enumerate(record_keys):
+
+            positions = key_index.get(key)
+
+            if positions:
+                target_positions += positions
+                record_rows += [record_row] * len(positions)
+            else:
+                new_rows.append(record_row)
+
+        value_columns = [column for column in records.columns if column not in self.key_columns]
+
+        for column in value_columns:
+            if column not in dataframe.columns:
+                dataframe[column] = ""
+
+        if target_positions:
+            for column in value_columns:
+
+                values = records[column].to_numpy()[record_rows]
+                given = pandas.notna(values)
+
+                if not given.any():
+                    continue
+
+                if isinstance(dataframe[column].dtype, pandas.CategoricalDtype):
+                    new_categories = set(values[given]) - set(dataframe[column].cat.categories)
+                    dataframe[column] = dataframe[column].cat.add_categories(sorted(new_categories))
+
+                dataframe.iloc[numpy.array(target_positions)[given], dataframe.columns.get_loc(column)] = values[given]
+
+        if new_rows:
+            start = len(dataframe)
+            new_frame = records.iloc[new_rows].reindex(columns=dataframe.columns).fillna("")
+
+            self._dataframe = pandas.concat([dataframe, new_frame], axis=0, ignore_index=True)
+
+            for offset, record_row in enumerate(new_rows):
+                key_index[record_keys[record_row]] = [start + offset]
+
+            self._key_index_rows = len(self._dataframe)
+
+        return len(record_keys) - len(new_rows), len(new_rows)
+
+    def delete(self, keys):
+
+        """removes every clip matching a list of keys, returns the number of clips removed"""
+
+        key_index = self.key_index()
+
+        positions = {position for key in keys for position in key_index.get(key_tuple(key), [])}
+
+        if not positions:
+            return 0
+
+        keep = numpy.ones(len(self.dataframe), dtype=bool)
+        keep[list(positions)] = False
+
+        # the rows after the removed ones move up, so the key index is rebuilt when it's next used
+        self.dataframe = self.dataframe[keep].reset_index(drop=True)
+
+        return len(positions)
+
+    def _key_changed(self, *columns):
+
+        if self._key_index is not None and any(column in self.key_columns for column in columns):
+            self._key_index = None
 
     def validate(self):
 
@@ -184,39 +471,64 @@ class Ale:
 
         self.dataframe.to_csv(filename, sep='\t', index=False, quoting=csv.QUOTE_NONE)
 
-    def to_file(self, filename):
+    def to_file(self, filename, return_contents=False):
 
-        """save out ALE object to ALE file on disk"""
+        """save out ALE object to ALE file on disk - the file is written to a temporary file alongside it and then
+        renamed into place, so an existing ALE is never left half written. Returns the file contents as a string if
+        return_contents is set"""
 
-        self.dataframe.to_csv(filename, sep='\t', index=False, header=True, quoting=csv.QUOTE_NONE,
-                              columns=list(self.dataframe))
+        temp_filename = f'{filename}.{os.getpid()}.tmp'
 
-        data_as_lines = []
+        try:
+            with open(temp_filename, 'w') as file_handler:
 
-        with open(filename, 'r+') as file_handler:
-            for line_contents in file_handler:
-                data_as_lines.append(line_contents.strip("\n"))
+                if return_contents:
+                    buffer = io.StringIO()
+                    self.write(buffer)
+                    file_handler.write(buffer.getvalue())
 
-        file_output = ['Heading']
+                else:
+                    self.write(file_handler)
 
-        for key, value in self.heading.items():
-            file_output.append(f'{key}\t{value}')
+            if os.path.exists(filename):
+                shutil.copymode(filename, temp_filename)
+
+            os.replace(temp_filename, filename)
 
-        file_output.append("")
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
 
-        file_output.append("Column")
+        if return_contents:
+            return buffer.getvalue()
 
-        file_output.append(data_as_lines[0])
+    def write(self, file_handler):
 
-        file_output.append("\nData")
+        """write the ALE Heading, Column and Data sections to an open text stream"""
 
-        file_output = file_output + data_as_lines[1:]
+        self.write_header(file_handler)
+        self.write_data(file_handler)
 
-        with open(filename, 'w') as file_handler:
-            file_handler.seek(0, 0)
-            file_handler.write("\n".join(file_output) + "\n")
+    def write_header(self, file_handler):
 
-        return "\n".join(file_output)
+        """write the ALE Heading and Column sections to an open text stream, up to the start of the data"""
+
+        file_handler.write("Heading\n")
+
+        for key, value in self.heading.items():
+            file_handler.write(f'{key}\t{value}\n')
+
+        file_handler.write("\nColumn\n")
+        file_handler.write("\t".join(str(column) for column in self.dataframe.columns) + "\n")
+
+        file_handler.write("\nData\n")
+
+    def write_data(self, file_handler):
+
+        """write the rows of the ALE Data section to an open text stream"""
+
+        self.dataframe.to_csv(file_handler, sep='\t', index=False, header=False, quoting=csv.QUOTE_NONE,
+                              lineterminator="\n")
 
     def sort_columns(self):
 
@@ -240,6 +552,7 @@ class Ale:
 
         if destination_column not in self.dataframe.columns or overwrite:
             self.dataframe[destination_column] = self.dataframe[source_column]
+            self._key_changed(destination_column)
 
         else:
             raise AleException(f'ALE Duplicate COl\n{destination_column} already in ALE, use overwrite option to set anyway')
@@ -250,6 +563,7 @@ class Ale:
 
         if new_name not in self.dataframe.columns:
             self.dataframe.rename(columns={column: new_name}, inplace=True)
+            self._key_changed(column, new_name)
 
         else:
             raise AleException(f'ALE Rename Column\n{new_name} already in ALE, use SET instead')
@@ -258,108 +572,1080 @@ class Ale:
 
         """sets the value of a column to a string - supports accessing values from other columns with {column name}"""
 
-        self.dataframe['_temp'] = value
+        self.dataframe[column] = self.template_values(value)
+        self._key_changed(column)
 
-        dynamic_matches = re.findall(r'{[a-zA-Z0-9 _-]+}', value)
+    def template_values(self, value):
 
-        for match_tag in dynamic_matches:
+        """returns the values a SET template resolves to for each row, or the value itself if it has no dynamic
+        {column name} tags"""
 
-            match_string = match_tag.strip("{").strip("}")
+        template = compile_template(value)
 
-            if match_string not in self.dataframe.columns:
+        for is_tag, text in template:
+            if is_tag and text not in self.dataframe.columns:
+                raise AleException(f"ALE Set Column\nDynamic tag {text} isn't in the dataframe")
 
-                raise AleException(f"ALE Set Column\nDynamic tag {match_string} isn't in the dataframe")
+        if not any(is_tag for is_tag, text in template):
+            return value
 
-            else:
-                for index, contents in enumerate(self.dataframe['_temp']):
-                    value_from_other = str(self.dataframe.loc[index, match_string])
+        new_values = pandas.Series("", index=self.dataframe.index, dtype=object)
 
-                    new_value = contents.replace(match_tag, value_from_other)
+        for is_tag, text in template:
 
-                    self.dataframe.loc[index, '_temp'] = new_value
+            if is_tag:
+                # cells with no value (e.g. unmatched rows after a merge) are written out empty, so copy them as empty
+                new_values = new_values + self.dataframe[text].astype(object).fillna("").astype(str)
+            else:
+                new_values = new_values + text
 
-        self.dataframe[column] = self.dataframe['_temp']
-        self.dataframe.drop('_temp', axis=1)
+        return new_values
 
     def regex_column(self, column, regex, mode="match", replace=""):
 
         """applies a regex operation to the specified column - options are 'replace' (replaces every match with
         'replace' string), and 'match' (sets the column to only matched text) """
 
-        for index, original_value in enumerate(self.dataframe[column]):
+        self.transform_column(column, [regex_transform(regex, mode, replace)])
 
-            new_value = "new_value"
+    def timecode_to_frame_number(self, column):
 
-            if mode == "replace":
-                new_value = re.sub(regex, replace, original_value)
+        """converts timecode to frame number"""
 
-            elif mode == "match":
+        fps = self.heading["FPS"]
 
-                matches = re.findall(regex, original_value)
-                new_value = "".join(matches)
+        self.transform_column(column, [lambda values: timecodes_to_frame_numbers(values, fps, 7)], distinct=False)
 
-            self.dataframe.loc[index, column] = new_value
+    def frame_number_to_timecode(self, column):
 
-    def timecode_to_frame_number(self, column):
+        """converts frame number to timecode"""
 
-        """converts timecode to frame number"""
+        fps = self.heading["FPS"]
+
+        self.transform_column(column, [lambda values: frame_numbers_to_timecodes(values, fps)], distinct=False)
+
+    def transform_column(self, column, transforms, value=None, distinct=True):
+
+        """applies a list of vectorised transforms, in order, to each distinct value of a column and maps the results
+        back in a single pass - columns like Tape, Start or Resolution repeat heavily, so this is much cheaper than
+        transforming every row. If value is given, the transforms are applied to that SET template instead of the
+        column's current values. distinct=False transforms every row directly, for columns like Start where nearly
+        every value is unique and mapping them back would only add work"""
+
+        source = self.dataframe[column] if value is None else self.template_values(value)
+
+        if isinstance(source, str):
+            new_value = pandas.Series([source], dtype=object)
+
+            for transform in transforms:
+                new_value = transform(new_value)
+
+            self.dataframe[column] = new_value[0]
+            self._key_changed(column)
+            return
+
+        if not distinct:
+            new_values = pandas.Series(source.dropna(), dtype=object)
+
+            for transform in transforms:
+                new_values = transform(new_values)
+
+            # keep the column's dtype, as mapping distinct values does
+            new_values = new_values.reindex(source.index)
+            new_dtype = "category" if isinstance(source.dtype, pandas.CategoricalDtype) else source.dtype
+
+            self.dataframe[column] = new_values.astype(new_dtype)
+            self._key_changed(column)
+            return
+
+        unique_values = pandas.Series(source.dropna().unique(), dtype=object)
+        new_values = unique_values
+
+        for transform in transforms:
+            new_values = transform(new_values)
+
+        self.dataframe[column] = source.map(dict(zip(unique_values, new_values)))
+        self._key_changed(column)
+
+
+def key_tuple(key):
+    """returns a key for the key index, a single value is a key for one key column"""
+
+    return tuple(key) if isinstance(key, (tuple, list)) else (key,)
+
+
+def append_frames(frames):
+    """concatenates dataframes the way a chain of Ale.append calls would - while the result so far is empty it's
+    replaced by the next dataframe rather than concatenated with it"""
+
+    start = next((position for position, frame in enumerate(frames[:-1]) if not frame.empty), len(frames) - 1)
+
+    if start == len(frames) - 1:
+        return frames[-1].copy()
+
+    return pandas.concat(frames[start:], axis=0, ignore_index=True)
+
+
+def append_columns(sources):
+    """returns the columns append_frames will give for a list of dataframes or deferred frames, if they're known"""
+
+    start = next((position for position, source in enumerate(sources[:-1]) if not source.empty), len(sources) - 1)
+
+    return union_columns(sources[start:])
+
+
+def union_columns(sources):
+    """returns the columns of concatenated dataframes or deferred frames in order of appearance, or None if any of the
+    deferred frames' columns aren't known"""
+
+    columns = {}
+
+    for source in sources:
+
+        if source.columns is None:
+            return None
+
+        columns.update(dict.fromkeys(source.columns))
+
+    return list(columns)
+
+
+def merge_frames(left_frame, right_frame, match_on, compact=False, return_errors=False):
+    """outer joins two ALE dataframes on the match_on columns, the right dataframe's columns that are also in the left
+    are suffixed with _2 - returns the merged dataframe, a list of clips only in the left, a list of clips only in the
+    right, a list of columns present in both, and a list of clips that appear more than once in either dataframe. The
+    lists are only filled in with return_errors"""
+
+    left_only, right_only, duplicate_columns, duplicate_keys = [], [], [], []
+
+    if left_frame.empty:
+        return right_frame.copy(), left_only, right_only, duplicate_columns, duplicate_keys
+
+    key_table, left_codes, right_codes = build_key_index(left_frame, right_frame, match_on)
+
+    # join on a single integer key rather than the string key columns, keys are numbered in sorted order so rows come
+    # out in the same order as a merge on the key columns themselves
+    merged_frame = pandas.merge(left_frame.assign(_merge_key=left_codes),
+                                right_frame.drop(columns=match_on).assign(_merge_key=right_codes),
+                                how="outer", on="_merge_key", suffixes=("", "_2"), indicator=True)
+
+    merge_status = merged_frame.pop("_merge").to_numpy()
+    merged_codes = merged_frame.pop("_merge_key").to_numpy()
+
+    # rows only in the right dataframe take their key values from the key index
+    is_right_only = merge_status == "right_only"
+
+    if is_right_only.any():
+        right_only_keys = key_table.iloc[merged_codes[is_right_only]]
+
+        for column in match_on:
+            key_values = right_only_keys[column].to_numpy()
+
+            if isinstance(merged_frame[column].dtype, pandas.CategoricalDtype):
+                new_categories = set(key_values) - set(merged_frame[column].cat.categories)
+                merged_frame[column] = merged_frame[column].cat.add_categories(sorted(new_categories))
+
+            merged_frame.loc[is_right_only, column] = key_values
+
+    if compact:
+        merged_frame = compact_dataframe(merged_frame)
+
+    if return_errors:
+        key_strings = _key_strings(key_table, match_on)
+
+        left_only = key_strings[merged_codes[merge_status == "left_only"]].tolist()
+        right_only = key_strings[merged_codes[is_right_only]].tolist()
+
+        duplicate_columns = [column for column in right_frame.columns
+                             if column in left_frame.columns and column not in match_on]
+
+        key_count = len(key_table)
+        is_duplicate = ((numpy.bincount(left_codes, minlength=key_count) > 1) |
+                        (numpy.bincount(right_codes, minlength=key_count) > 1))
+
+        duplicate_keys = key_strings[is_duplicate].tolist()
+
+    return merged_frame, left_only, right_only, duplicate_columns, duplicate_keys
+
+
+def regex_transform(regex, mode="match", replace=""):
+    """returns a transform for Ale.transform_column that applies a regex operation to a series of values - options
+    are 'replace' (replaces every match with 'replace' string), and 'match' (keeps only matched text, or only the
+    text of its groups if the regex has any)"""
+
+    pattern = compile_regex(regex)
+
+    if mode == "replace":
+        return lambda values: values.str.replace(pattern, replace, regex=True)
+
+    elif mode == "match" and pattern.groups > 1:
+        # findall gives a tuple of groups for each match, every group of every match is kept
+        return lambda values: values.str.findall(pattern).map(lambda matches: "".join(map("".join, matches)),
+                                                              na_action="ignore")
+
+    elif mode == "match":
+        return lambda values: values.str.findall(pattern).str.join("")
+
+    raise AleException(f'ALE Regex Column\n{mode} is not a valid regex mode')
+
+
+def map_transform(map_pairs):
+    """returns a transform for Ale.transform_column that replaces every occurrence of each from string with its to
+    string, for a list of (from, to) pairs applied in order - a single scan with a combined pattern of all the from
+    strings finds the values that can change, and only those are translated, rather than scanning every value once
+    per pair"""
+
+    pattern = compile_regex("|".join(re.escape(map_from) for map_from, map_to in map_pairs))
+
+    def translate(value):
+        for map_from, map_to in map_pairs:
+            value = value.replace(map_from, map_to)
+        return value
+
+    def map_values(values):
+
+        matches = values.str.contains(pattern, na=False)
+
+        if not matches.any():
+            return values
+
+        new_values = values.copy()
+        new_values[matches] = [translate(value) for value in values[matches]]
+
+        return new_values
+
+    return map_values
+
+
+@functools.lru_cache(maxsize=32)
+def frame_rate_info(fps):
+    """returns the integer frame rate, the number of frames dropped per minute and the float frame rate for an FPS
+    heading value, following the timecode library's drop frame rules - returns None for frame rates that aren't
+    plain numbers"""
+
+    try:
+        float_fps = float(fps)
+    except ValueError:
+        return None
+
+    int_fps = round(float_fps * 1001 / 1000)
+
+    # NTSC rates, drop frame only applies to multiples of 29.97
+    if abs(float_fps - int_fps * 1000 / 1001) < 0.005:
+        drop_frames = round(float_fps * 0.066666) if int_fps % 30 == 0 else 0
+        return int_fps, drop_frames, float_fps
+
+    return int(float_fps), 0, float_fps
+
+
+def timecodes_to_frame_numbers(values, fps, zero_fill=0):
+    """converts a series of HH:MM:SS:FF or drop frame HH:MM:SS;FF timecodes to a series of frame number strings,
+    zero filled to zero_fill digits - empty values are left empty"""
+
+    values = pandas.Series(values, dtype=object)
+    rate_info = frame_rate_info(fps)
+    is_empty = values == ""
+
+    if rate_info is None:
+        # unusual frame rates fall back to the timecode library
+        return values.map(lambda value: value if value == "" else
+                          str(timecode.Timecode(fps, value).frame_number).zfill(zero_fill))
+
+    int_fps, drop_frames, float_fps = rate_info
+
+    hours, minutes, seconds, frames = _timecode_parts(values, is_empty)
+
+    total_minutes = 60 * hours + minutes
+
+    frame_numbers = (int_fps * (3600 * hours + 60 * minutes + seconds) + frames -
+                     drop_frames * (total_minutes - total_minutes // 10))
+
+    frame_numbers = pandas.Series(frame_numbers, index=values.index).astype(str)
+
+    if zero_fill:
+        frame_numbers = frame_numbers.str.zfill(zero_fill)
+
+    return frame_numbers.mask(is_empty, "")
+
+
+def _timecode_parts(values, is_empty):
+    """returns arrays of hours, minutes, seconds and frames for a series of timecodes, 0 for empty values - values
+    in the usual fixed width HH:MM:SS:FF layout are read straight from their characters, anything else is parsed with
+    TIMECODE_PATTERN"""
+
+    characters = numpy.array(values.tolist(), dtype=str)
+    width = characters.dtype.itemsize // 4
+    parts = numpy.zeros((4, len(values)), dtype=numpy.int64)
+
+    if len(values) and width >= 11:
+        codes = characters.view(numpy.uint32).reshape(len(values), width).astype(numpy.int64)
+        digits = codes[:, [0, 1, 3, 4, 6, 7, 9, 10]] - ord("0")
+
+        fixed_width = ((digits >= 0) & (digits <= 9)).all(axis=1) & (codes[:, 2] == ord(":")) & \
+            (codes[:, 5] == ord(":")) & ((codes[:, 8] == ord(":")) | (codes[:, 8] == ord(";")))
+
+        if width > 11:
+            fixed_width &= codes[:, 11] == 0
+
+        parts[:, fixed_width] = (10 * digits[fixed_width, 0::2] + digits[fixed_width, 1::2]).T
+
+    else:
+        fixed_width = numpy.zeros(len(values), dtype=bool)
+
+    others = ~fixed_width & ~is_empty.to_numpy()
+
+    if others.any():
+        other_parts = values[others].str.extract(TIMECODE_PATTERN)
+        invalid = other_parts.isna().any(axis=1)
+
+        if invalid.any():
+            raise AleException(f'ALE Timecode\n{values[others][invalid].iloc[0]} is not a valid timecode')
+
+        parts[:, others] = other_parts.astype(numpy.int64).to_numpy().T
+
+    return parts
+
+
+def frame_numbers_to_timecodes(values, fps):
+    """converts a series of frame numbers to a series of timecode strings, drop frame timecodes use a ; before the
+    frames - empty values are left empty"""
+
+    values = pandas.Series(values, dtype=object)
+    rate_info = frame_rate_info(fps)
+    is_empty = values == ""
+
+    try:
+        frame_numbers = pandas.to_numeric(values.mask(is_empty, 0)).astype(numpy.int64).to_numpy()
+    except (TypeError, ValueError):
+        raise AleException('ALE Timecode\nColumn contains values that are not frame numbers')
+
+    if rate_info is None:
+        # unusual frame rates fall back to the timecode library
+        timecodes = [str(timecode.Timecode(fps, frames=int(frame_number) + 1)) for frame_number in frame_numbers]
+        return pandas.Series(timecodes, index=values.index, dtype=object).mask(is_empty, "")
+
+    int_fps, drop_frames, float_fps = rate_info
+
+    # timecode rolls over after 24 hours
+    frame_numbers = frame_numbers % round((float_fps if drop_frames else int_fps) * 60 * 60 * 24)
+
+    if drop_frames:
+        frames_per_10_minutes = round(float_fps * 60 * 10)
+        frames_per_minute = round(float_fps) * 60 - drop_frames
+
+        tens_of_minutes, remainder = numpy.divmod(frame_numbers, frames_per_10_minutes)
+        dropped_minutes = numpy.where(remainder > drop_frames, (remainder - drop_frames) // frames_per_minute, 0)
+
+        frame_numbers = frame_numbers + drop_frames * 9 * tens_of_minutes + drop_frames * dropped_minutes
+
+    total_seconds = frame_numbers // int_fps
+    frame_delimiter = ";" if drop_frames else ":"
+
+    parts = [total_seconds // 3600, total_seconds // 60 % 60, total_seconds % 60, frame_numbers % int_fps]
+
+    if int_fps > 100:
+        timecodes = (_zero_padded(parts[0]) + ":" + _zero_padded(parts[1]) + ":" + _zero_padded(parts[2]) +
+                     frame_delimiter + _zero_padded(parts[3])).to_numpy()
+    else:
+        timecodes = _fixed_width_timecodes(parts, frame_delimiter)
+
+    return pandas.Series(timecodes, index=values.index, dtype=object).mask(is_empty, "")
+
+
+def _fixed_width_timecodes(parts, frame_delimiter):
+    """builds HH:MM:SS:FF strings from arrays of two digit hours, minutes, seconds and frames by writing their
+    characters straight into a fixed width string array"""
+
+    codes = numpy.empty((len(parts[0]), 11), dtype=numpy.uint32)
+    codes[:, [2, 5]] = ord(":")
+    codes[:, 8] = ord(frame_delimiter)
+
+    for position, part in zip((0, 3, 6, 9), parts):
+        codes[:, position] = part // 10 + ord("0")
+        codes[:, position + 1] = part % 10 + ord("0")
 
-        for index, original_value in enumerate(self.dataframe[column]):
-            new_value = "new_value"
+    return codes.view("U11").ravel().astype(object)
 
-            new_value = timecode.Timecode(self.heading["FPS"], original_value).frame_number
-            new_value = str(new_value).zfill(7)
 
-            self.dataframe.loc[index, column] = new_value
+def _zero_padded(numbers):
+    return pandas.Series(numbers).astype(str).str.zfill(2)
 
 
-def load_folder(folder_name):
+@functools.lru_cache(maxsize=256)
+def compile_regex(regex):
+    """returns a compiled regex pattern, cached so repeated actions don't recompile it"""
+
+    return re.compile(regex)
+
+
+def compile_template(value):
+    """splits a SET value into a list of (is_tag, text) parts, where text is a column name for {column} tags and a
+    literal string otherwise"""
+
+    template = []
+    position = 0
+
+    for match in DYNAMIC_TAG_PATTERN.finditer(value):
+
+        if match.start() > position:
+            template.append((False, value[position:match.start()]))
+
+        template.append((True, match.group()[1:-1]))
+        position = match.end()
+
+    if position < len(value):
+        template.append((False, value[position:]))
+
+    return template
+
+
+class DeferredFrame:
+
+    """a dataframe that isn't built until it's first needed, by calling build with the list of source dataframes - the
+    sources are shallow copies of the input dataframes, or the inputs' own deferred frames, so later changes to the
+    inputs don't change the result. Several ALEs can share one, each takes a shallow copy of the result"""
+
+    def __init__(self, build, sources, empty, columns=None):
+
+        self.build = build
+        self.sources = sources
+
+        # known without building, columns is None if it can't be worked out in advance
+        self.empty = empty
+        self.columns = columns
+
+        self.result = None
+
+    def materialize(self):
+
+        if self.result is None:
+            frames = [source.materialize() if isinstance(source, DeferredFrame) else source for source in self.sources]
+            self.result = self.build(frames)
+
+            # let go of the inputs once they've been used
+            self.build = self.sources = None
+
+        return self.result
+
+
+class AleWriter:
+
+    """writes an ALE to disk a chunk of rows at a time, taking the heading and columns from the first chunk - like
+    Ale.to_file, the output goes to a temporary file that's only renamed into place once it's complete"""
+
+    def __init__(self, filename):
+
+        self.filename = filename
+        self.temp_filename = f'{filename}.{os.getpid()}.tmp'
+        self.columns = None
+
+        self.file_handler = open(self.temp_filename, 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+
+        if exception_type:
+            self.abort()
+        else:
+            self.close()
+
+    def write(self, ale_obj):
+
+        """write a chunk of rows, all chunks must have the same columns"""
+
+        if self.columns is None:
+            ale_obj.write_header(self.file_handler)
+            self.columns = list(ale_obj.dataframe.columns)
+
+        elif list(ale_obj.dataframe.columns) != self.columns:
+            raise AleException(f"ALE Writer\nChunk columns don't match the columns already written to "
+                               f"{self.filename}")
+
+        ale_obj.write_data(self.file_handler)
+
+    def close(self):
+
+        """finish the file and move it into place"""
+
+        self.file_handler.close()
+
+        if os.path.exists(self.filename):
+            shutil.copymode(self.filename, self.temp_filename)
+
+        os.replace(self.temp_filename, self.filename)
+
+    def abort(self):
+
+        """discard the file, leaving any existing file untouched"""
+
+        self.file_handler.close()
+        _remove_quietly(self.temp_filename)
+
+
+def iter_chunks(filename, chunk_size=CHUNK_ROWS, usecols=None):
+    """yields an ALE file as a series of ALE objects of at most chunk_size rows, so files too large to load can be
+    processed one chunk at a time - the chunks share one heading dictionary. If usecols is given only those columns
+    are read. The data is parsed the same way as Ale.load_from_file"""
+
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(f'{filename} is not a valid file')
+
+    if os.path.getsize(filename) == 0:
+        raise AleException(f'ALE Load\n{filename} is empty')
+
+    with open(filename, "r") as file_handler:
+
+        heading, column_line = read_heading(file_handler)
+
+        if not column_line.strip():
+            raise AleException(f'ALE Load\n{filename} has no Column section')
+
+        column_names, positions = column_positions(column_line, usecols)
+
+        # the handle is left at the start of the data, the parser carries on from there a chunk at a time
+        with read_data(file_handler, column_names, positions, chunksize=chunk_size) as reader:
+
+            for dataframe in reader:
+
+                dataframe = dataframe[positions]
+                dataframe.columns = column_names[positions]
+
+                chunk = Ale()
+                chunk.name = os.path.basename(filename)
+                chunk.filename = filename
+                chunk.heading = heading
+                chunk.dataframe = dataframe
+
+                yield chunk
+
+
+def column_positions(column_line, usecols=None):
+    """returns the column names from an ALE's raw column line and the positions of the ones to read - the blank
+    names left by trailing tabs are skipped, and if usecols is given only those columns are read"""
+
+    # the column line goes through the parser on its own so duplicate and blank names are handled as before
+    column_names = pandas.read_csv(io.StringIO(column_line), sep="\t", nrows=0).columns
+
+    positions = [position for position, column in enumerate(column_names)
+                 if not column.startswith('Unnamed') and (usecols is None or column in usecols)]
+
+    return column_names, positions
+
+
+def read_data(source, column_names, positions, dtype=str, encoding=None, chunksize=None):
+    """parses the Data section of an ALE from source, returns a dataframe (or a reader of chunksize row dataframes)
+    whose columns are the positions read - rows are matched to the column line by position, so rows with more
+    fields than there are columns don't shift. If no columns are wanted the first is still read, so the number of
+    rows is known"""
+
+    return pandas.read_csv(source, sep="\t", header=None, names=range(len(column_names)), usecols=positions or [0],
+                           index_col=False, encoding=encoding, dtype=dtype, keep_default_na=False,
+                           chunksize=chunksize)
+
+
+def compact_dataframe(dataframe):
+    """returns a copy of the dataframe with columns that have few distinct values (like Tape, Camera or FPS) stored
+    as categoricals, and the rest as Arrow backed strings if pyarrow is installed - the values are unchanged, so ALE
+    and CSV output is identical"""
+
+    row_limit = max(COMPACT_CATEGORY_RATIO * len(dataframe), 1)
+    columns = []
+
+    for position in range(len(dataframe.columns)):
+
+        column = dataframe.iloc[:, position]
+
+        if isinstance(column.dtype, pandas.CategoricalDtype):
+            distinct_count = len(column.cat.categories)
+        else:
+            distinct_count = column.nunique()
+
+        if distinct_count <= row_limit:
+            columns.append(column.astype("category"))
+        else:
+            columns.append(column.astype(compact_string_dtype()))
+
+    if not columns:
+        return dataframe.copy()
+
+    return pandas.concat(columns, axis=1)
+
+
+@functools.lru_cache(maxsize=None)
+def compact_string_dtype():
+    """returns the dtype compact mode stores high cardinality columns as, Arrow backed strings need pyarrow"""
+
+    if importlib.util.find_spec("pyarrow") is None:
+        return str
+
+    return pandas.StringDtype("pyarrow")
+
+
+def build_key_index(left_frame, right_frame, key_columns):
+    """numbers every distinct combination of key column values across two dataframes in sorted order - returns a
+    dataframe of the distinct keys indexed by their number, and the key number of every row in each dataframe"""
+
+    # plain objects, so categorical keys are still numbered in sorted value order
+    combined_keys = pandas.concat([left_frame[key_columns].astype(object), right_frame[key_columns].astype(object)],
+                                  ignore_index=True)
+
+    key_codes = combined_keys.groupby(key_columns, sort=True, dropna=False).ngroup().to_numpy()
+
+    unique_codes, first_rows = numpy.unique(key_codes, return_index=True)
+    key_table = combined_keys.iloc[first_rows].set_index(unique_codes)
+
+    return key_table, key_codes[:len(left_frame)], key_codes[len(left_frame):]
+
+
+def _key_strings(key_table, key_columns):
+    """returns a numpy array of the key values joined into one string per key, for reporting"""
+
+    key_strings = key_table[key_columns[0]].astype(object).fillna("").astype(str)
+
+    for column in key_columns[1:]:
+        key_strings = key_strings + " " + key_table[column].astype(object).fillna("").astype(str)
+
+    return key_strings.to_numpy()
+
+
+def find_sections(file_map):
+    """finds the Column and Data markers in the raw bytes of an ALE with byte searches, only the part of the file
+    before the data is decoded - returns the heading dictionary, the raw column line and the offset of the data"""
+
+    column_marker = COLUMN_MARKER_PATTERN.search(file_map)
+
+    # the data marker is searched for after the column line, so a column named Data isn't mistaken for it
+    search_start = file_map.find(b"\n", column_marker.end() + 1) if column_marker else 0
+    data_marker = DATA_MARKER_PATTERN.search(file_map, max(search_start, 0))
+
+    data_start = min(data_marker.end() + 1, len(file_map)) if data_marker else len(file_map)
+
+    heading_text = file_map[:data_start].decode(locale.getpreferredencoding(False))
+    heading, column_line = read_heading(io.StringIO(heading_text))
+
+    return heading, column_line, data_start
+
+
+def read_heading(file_handler):
+    """reads the Heading and Column sections from an open ALE file, leaving the handle at the start of the Data
+    section - returns the heading dictionary and the raw column line"""
+
+    heading = {}
+    column_line = ""
+    in_heading = False
+
+    line_content = file_handler.readline()
+
+    while line_content:
+
+        stripped = line_content.strip()
+
+        if stripped == "":
+            pass
+
+        elif stripped == "Heading":
+            in_heading = True
+
+        elif stripped == "Column":
+            in_heading = False
+            column_line = file_handler.readline()
+
+        elif stripped == "Data":
+            # this is the last section we're interested in, the rest of the file is data
+            break
+
+        elif in_heading:
+            add_to_heading = stripped.split(maxsplit=1)
+            heading[add_to_heading[0]] = add_to_heading[1]
+
+        line_content = file_handler.readline()
+
+    return heading, column_line
+
+
+def load_folder(folder_name, workers=1, return_errors=False, compact=False):
     """returns a list of ALE objects from a folder"""
 
+    return load_list(list_folder(folder_name), workers=workers, return_errors=return_errors, compact=compact)
+
+
+def list_folder(folder_name):
+    """returns a list of the ALE filenames in a folder"""
+
     file_list = os.listdir(folder_name)
 
-    ale_file_list = [os.path.join(folder_name, x) for x in file_list if x.endswith('.ale') or x.endswith(".ALE")]
+    return [os.path.join(folder_name, x) for x in file_list if x.endswith('.ale') or x.endswith(".ALE")]
 
-    ale_list = load_list(ale_file_list)
 
-    return ale_list
+def process_pool_context():
+    """returns the multiprocessing context for process pools - fork is only safe on Linux and from a process with no
+    other threads (the UI runs its jobs on a worker thread), anywhere else workers are spawned"""
+
+    if sys.platform.startswith('linux') and threading.active_count() == 1:
+        return multiprocessing.get_context('fork')
 
+    return multiprocessing.get_context('spawn')
 
-def load_list(ale_file_list):
-    """returns a list of ALE objects from a list of filenames"""
+
+def load_list(ale_file_list, workers=1, return_errors=False, compact=False):
+    """returns a list of ALE objects from a list of filenames, in the same order - files are parsed on a process pool
+    when workers is more than 1. With return_errors, files that fail to load are left out and a list of
+    (filename, exception) is returned alongside the ALE objects instead of raising"""
 
     ale_list = []
+    load_errors = []
+
+    load = functools.partial(_try_load, compact=compact)
+
+    if workers > 1:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context())
+        results = executor.map(load, ale_file_list)
+    else:
+        executor = None
+        results = map(load, ale_file_list)
+
+    try:
+        for ale_file, (ale_obj, exception) in zip(ale_file_list, results):
+
+            if exception is None:
+                ale_list.append(ale_obj)
+
+            elif return_errors:
+                load_errors.append((ale_file, exception))
+
+            else:
+                raise exception
 
-    for ale_file in ale_file_list:
-        ale_list.append(Ale(ale_file))
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    if return_errors:
+        return ale_list, load_errors
 
     return ale_list
 
 
+def iter_load_list(ale_file_list, workers=1, compact=False):
+    """yields (filename, ALE object, exception) for each file as soon as it has loaded, so callers can start working
+    on early files while the rest are still parsing - exception is None if the file loaded, and the ALE object is None
+    if it didn't. With more than 1 worker, files are yielded in the order they finish rather than the order given"""
+
+    if workers <= 1:
+        for ale_file in ale_file_list:
+            yield (ale_file, *_try_load(ale_file, compact))
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=process_pool_context()) as executor:
+
+        futures = {executor.submit(_try_load, ale_file, compact): ale_file for ale_file in ale_file_list}
+
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield (futures[future], *future.result())
+
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _try_load(ale_file, compact=False):
+    """loads a single ALE, returning the exception rather than raising it so one bad file doesn't stop a batch"""
+
+    try:
+        return Ale(ale_file, compact=compact), None
+
+    except Exception as exception:
+        return None, exception
+
+
 def append_multiple(ales, return_errors=False):
-    """merge a list of ALE objects into a single ALE object"""
+    """merge a list of ALE objects into a single ALE object, with a single concat of all the data - the heading is
+    taken from the first ALE and none of the inputs are modified. With return_errors, returns the merged ALE, a list
+    of columns that are only present in some of the ALEs, and a dictionary of heading keys whose values differ
+    between ALEs, mapped to the list of values found"""
 
-    merged_ale = None
-    append_errors = []
+    if not ales:
+        return (None, [], {}) if return_errors else None
 
-    for index, this_ale in enumerate(ales):
+    merged_ale = Ale(compact=ales[0].compact, lazy=ales[0].lazy)
+    merged_ale.heading = dict(ales[0].heading)
 
-        if index == 0:
-            merged_ale = this_ale
-            continue
+    sources = [this_ale._source() for this_ale in ales if len(this_ale.columns())]
 
-        if return_errors:
-            count, self_missing, other_missing = merged_ale.append(this_ale, return_errors=True)
+    def concat_frames(frames):
 
-            if count:
-                append_errors = append_errors + self_missing + other_missing
+        dataframe = pandas.concat(frames, axis=0, ignore_index=True)
 
-        merged_ale.append(this_ale, inplace=True)
+        # categoricals with different categories concatenate to plain objects, so compact them again
+        return compact_dataframe(dataframe) if merged_ale.compact else dataframe
 
-    if return_errors:
-        return list(set(append_errors))
+    if sources and merged_ale.lazy:
+        merged_ale._defer(concat_frames, sources, columns=union_columns(sources))
+
+    elif sources:
+        merged_ale.dataframe = concat_frames(sources)
+
+    if not return_errors:
+        return merged_ale
+
+    common_columns = set.intersection(*[set(this_ale.columns()) for this_ale in ales])
+
+    missing_columns = [column for column in merged_ale.columns() if column not in common_columns]
+
+    heading_values = {}
+
+    for this_ale in ales:
+        for key, value in this_ale.heading.items():
+            values = heading_values.setdefault(key, [])
+
+            if value not in values:
+                values.append(value)
+
+    heading_conflicts = {key: values for key, values in heading_values.items() if len(values) > 1}
+
+    return merged_ale, missing_columns, heading_conflicts
+
+
+class ParseCache:
+
+    """an on disk cache of parsed ALEs, so reopening a file skips parsing it - entries are .npz files of each column's
+    distinct values and codes, with the heading and column names as JSON, named by a hash of the file contents and
+    found through small reference files named by a hash of the path, modification time and size. Entries are loaded
+    with allow_pickle=False, so a cache folder shared between machines can't be used to run code. Least recently used
+    entries are removed once the cache is over max_bytes"""
+
+    def __init__(self, folder, max_bytes=PARSE_CACHE_MAX_BYTES):
+
+        self.folder = folder
+        self.max_bytes = max_bytes
+
+        os.makedirs(folder, exist_ok=True)
+
+    def load(self, filename, compact, parse):
+
+        """returns the (heading, dataframe) for an ALE file from the cache, calling parse(filename) and caching the
+        result if it isn't there"""
+
+        file_stat = os.stat(filename)
+        stat_key = _hash_text(f'{os.path.abspath(filename)}|{file_stat.st_mtime_ns}|{file_stat.st_size}|{compact}')
+        reference_file = os.path.join(self.folder, f'{stat_key}.ref')
+
+        try:
+            with open(reference_file, 'r') as file_handler:
+                content_key = file_handler.read().strip()
+
+            # a reference is only ever a hash, anything else could point outside the cache folder
+            if not re.fullmatch('[0-9a-f]{32}', content_key):
+                raise FileNotFoundError(reference_file)
+
+        except FileNotFoundError:
+            # the file is new or has been touched, hashing its contents still finds entries for unchanged files
+            content_key = _hash_file(filename, f'{PARSE_CACHE_VERSION}|{pandas.__version__}|{compact}')
+            self._write_atomic(reference_file, content_key.encode())
+
+        entry_file = os.path.join(self.folder, f'{content_key}.npz')
+
+        try:
+            cached = _read_cache_entry(entry_file, compact)
+
+            # mark the entry as recently used
+            os.utime(entry_file)
+
+            return cached
+
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+
+        parsed = parse(filename)
+        contents = _cache_entry_contents(*parsed)
+
+        if contents is not None:
+            self._write_atomic(entry_file, contents)
+            self.evict()
+
+        return parsed
+
+    def evict(self):
+
+        """removes the least recently used entries until the cache is under max_bytes, along with any references to
+        entries that no longer exist"""
+
+        entries = []
+
+        for file_name in os.listdir(self.folder):
+            if file_name.endswith('.npz'):
+                file_stat = os.stat(os.path.join(self.folder, file_name))
+                entries.append((file_stat.st_mtime, file_stat.st_size, file_name))
+
+        entries.sort()
+        total_bytes = sum(entry_size for entry_time, entry_size, file_name in entries)
+        evicted = False
+
+        while entries and total_bytes > self.max_bytes:
+            entry_time, entry_size, file_name = entries.pop(0)
+            total_bytes -= entry_size
+            evicted = True
+            _remove_quietly(os.path.join(self.folder, file_name))
 
-    return merged_ale
+        if evicted:
+            kept = {file_name[:-len('.npz')] for entry_time, entry_size, file_name in entries}
+
+            for file_name in os.listdir(self.folder):
+                if file_name.endswith('.ref'):
+                    reference_file = os.path.join(self.folder, file_name)
+
+                    try:
+                        with open(reference_file, 'r') as file_handler:
+                            if file_handler.read().strip() not in kept:
+                                _remove_quietly(reference_file)
+
+                    except OSError:
+                        pass
+
+    def clear(self):
+
+        # .pkl entries are from caches written by older versions
+        for file_name in os.listdir(self.folder):
+            if file_name.endswith(('.npz', '.ref', '.pkl')):
+                _remove_quietly(os.path.join(self.folder, file_name))
+
+    def _write_atomic(self, destination, contents):
+
+        temp_filename = f'{destination}.{os.getpid()}.tmp'
+
+        try:
+            with open(temp_filename, 'wb') as file_handler:
+                file_handler.write(contents)
+
+            os.replace(temp_filename, destination)
+
+        except OSError:
+            # the cache is only an optimisation, so failing to write to it isn't an error
+            _remove_quietly(temp_filename)
+
+
+def enable_parse_cache(folder=None, max_bytes=PARSE_CACHE_MAX_BYTES):
+    """turns on the on disk cache of parsed ALEs for this process and any worker processes it starts - folder
+    defaults to .ale_cache in the user's home folder"""
+
+    global parse_cache
+
+    folder = folder or os.path.join(os.path.expanduser('~'), '.ale_cache')
+
+    parse_cache = ParseCache(folder, max_bytes)
+
+    # worker processes import this module fresh, and pick the cache up from the environment
+    os.environ[PARSE_CACHE_ENVIRONMENT] = folder
+    os.environ[PARSE_CACHE_SIZE_ENVIRONMENT] = str(max_bytes)
+
+    return parse_cache
+
+
+def disable_parse_cache():
+    """turns off the on disk cache of parsed ALEs, the cached files are left in place"""
+
+    global parse_cache
+
+    parse_cache = None
+
+    os.environ.pop(PARSE_CACHE_ENVIRONMENT, None)
+    os.environ.pop(PARSE_CACHE_SIZE_ENVIRONMENT, None)
+
+
+def _cache_entry_contents(heading, dataframe):
+    """returns a parsed ALE as the bytes of a parse cache entry, or None if it can't be cached - each column is stored
+    as its distinct values joined by NUL characters and the codes of its rows, as for a categorical"""
+
+    arrays = {}
+
+    # per column, the dtype of its categories or None if it isn't a categorical, and the number of distinct values
+    category_dtypes, sizes = [], []
+
+    for position in range(len(dataframe.columns)):
+
+        column = dataframe.iloc[:, position]
+
+        if isinstance(column.dtype, pandas.CategoricalDtype):
+            codes, values = column.cat.codes.to_numpy(), list(column.cat.categories)
+        else:
+            codes, values = pandas.factorize(column)
+            values = list(values)
+
+        joined = "\0".join(values)
+
+        # the separator can't be told apart from a value that contains it, and missing values (code -1) aren't stored
+        if joined.count("\0") != max(len(values) - 1, 0) or (codes < 0).any():
+            return None
+
+        category_dtypes.append(str(column.cat.categories.dtype)
+                               if isinstance(column.dtype, pandas.CategoricalDtype) else None)
+        sizes.append(len(values))
+        arrays[f'codes_{position}'] = codes.astype(numpy.int32)
+        arrays[f'values_{position}'] = numpy.frombuffer(joined.encode(), dtype=numpy.uint8)
+
+    metadata = {'heading': heading, 'columns': list(dataframe.columns), 'category_dtypes': category_dtypes,
+                'sizes': sizes, 'rows': len(dataframe)}
+
+    arrays['metadata'] = numpy.frombuffer(json.dumps(metadata).encode(), dtype=numpy.uint8)
+
+    contents = io.BytesIO()
+    numpy.savez(contents, **arrays)
+
+    return contents.getvalue()
+
+
+def _read_cache_entry(entry_file, compact):
+    """returns the (heading, dataframe) stored in a parse cache entry, as _cache_entry_contents wrote it"""
+
+    with numpy.load(entry_file, allow_pickle=False) as entry:
+
+        metadata = json.loads(entry['metadata'].tobytes().decode())
+        columns = {}
+
+        for position, (category_dtype, size) in enumerate(zip(metadata['category_dtypes'], metadata['sizes'])):
+
+            codes = entry[f'codes_{position}']
+            values = numpy.array(entry[f'values_{position}'].tobytes().decode().split("\0") if size else [],
+                                 dtype=object)
+
+            if category_dtype:
+                columns[position] = pandas.Categorical.from_codes(codes, pandas.Index(values, dtype=category_dtype))
+                continue
+
+            # factorize numbers values in order of appearance, so a column of distinct values is already in order
+            if size != len(codes):
+                values = values.take(codes)
+
+            columns[position] = pandas.array(values, dtype=compact_string_dtype() if compact else str)
+
+    dataframe = pandas.DataFrame(columns, index=pandas.RangeIndex(metadata['rows']), copy=False)
+    dataframe.columns = pandas.Index(metadata['columns'])
+
+    return metadata['heading'], dataframe
+
+
+def _hash_text(text):
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _hash_file(filename, salt):
+    file_hash = hashlib.blake2b(salt.encode(), digest_size=16)
+
+    with open(filename, 'rb') as file_handler:
+        for block in iter(lambda: file_handler.read(1024 * 1024), b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+
+def _remove_quietly(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
 
 
 class AleException(Exception):
@@ -368,5 +1654,12 @@ class AleException(Exception):
         self.message = message
 
 
+# the parse cache is opt in, through enable_parse_cache or by setting ALE_PARSE_CACHE to a folder
+parse_cache = None
+
+if os.environ.get(PARSE_CACHE_ENVIRONMENT):
+    parse_cache = ParseCache(os.environ[PARSE_CACHE_ENVIRONMENT],
+                             int(os.environ.get(PARSE_CACHE_SIZE_ENVIRONMENT, PARSE_CACHE_MAX_BYTES)))
+
 if __name__ == '__main__':
     test_ale = Ale("AVID.ALE")
@@ -0,0 +1,177 @@
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import sys
+import time
+
+import ale
+import ale_macro
+
+
+def run_file(ale_filename, macro_file, output_file, chunk_size=None, profile=False, split=1):
+    """loads an ALE, runs a macro on it and saves the result, a chunk_size rows at a time if given, or split across
+    split processes by row - returns (filename, output filename, seconds taken, macro log messages, error message or
+    None, MacroProfile report or None)"""
+
+    start_time = time.perf_counter()
+    collector = ale_macro.MessageCollector()
+    macro_profile = ale_macro.MacroProfile() if profile else None
+
+    try:
+        macro = ale_macro.AleMacro(macro_file, manager=collector, profile=macro_profile, workers=split)
+
+        if chunk_size:
+            macro.run_streaming(ale_filename, output_file, chunk_size)
+
+        else:
+            ale_obj = macro.load(ale_filename)
+            macro.execute_actions(ale_obj)
+            macro.save(ale_obj, output_file)
+
+        error = None
+
+    except Exception as exception:
+        error = f'{type(exception).__name__}: {exception}'
+
+    finally:
+        if macro_profile:
+            macro_profile.close()
+
+    return ale_filename, output_file, time.perf_counter() - start_time, collector.messages, error, \
+        macro_profile.report() if macro_profile else None
+
+
+def batch_run(macro_file, ale_filenames, macro_name, pattern=ale_macro.OUTPUT_PATTERN, workers=1, chunk_size=None,
+              profile=False, split=1):
+    """runs a macro over a list of ALEs, on a process pool if workers is more than 1 - yields the run_file result
+    for each file as it finishes"""
+
+    jobs = [(ale_filename, macro_file, ale_macro.output_filename(ale_filename, macro_name, pattern), chunk_size,
+             profile, split) for ale_filename in ale_filenames]
+
+    if workers <= 1:
+        for job in jobs:
+            yield run_file(*job)
+        return
+
+    # the UI runs batches on a worker thread, so the pool mustn't be forked from it
+    context = ale.process_pool_context()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+
+        futures = [executor.submit(run_file, *job) for job in jobs]
+
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                yield future.result()
+
+        finally:
+            # if the caller stops early, don't start the files still queued
+            for future in futures:
+                future.cancel()
+
+
+def expand_inputs(inputs):
+    """expands globs in the input list, inputs that match nothing are kept so they're reported as missing"""
+
+    ale_filenames = []
+
+    for pattern in inputs:
+        ale_filenames += sorted(glob.glob(pattern)) or [pattern]
+
+    return ale_filenames
+
+
+def resolve_macro(preset):
+    """returns the macro file and name for a preset name, or a path to a macro file"""
+
+    preset_folder, macro_list = ale_macro.get_macros()
+
+    if preset in macro_list:
+        return os.path.join(preset_folder, f'{preset}.csv'), preset
+
+    if os.path.isfile(preset):
+        return preset, os.path.splitext(os.path.basename(preset))[0]
+
+    raise ale_macro.AleMacroException(f'{preset} is not a preset or macro file, available presets are: '
+                                      f'{", ".join(macro_list)}')
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description=f'Run an ALE macro preset over a batch of ALEs - version '
+                                                 f'{ale.__version__}')
+
+    parser.add_argument('preset', help='preset name from the presets folder, or a path to a macro CSV')
+    parser.add_argument('inputs', nargs='+', help='ALE files or glob patterns')
+    parser.add_argument('-o', '--output', default=ale_macro.OUTPUT_PATTERN,
+                        help='output filename pattern relative to each input, using {stem}, {macro} and {ext} '
+                             '(default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='number of files to process at once (default: %(default)s)')
+    parser.add_argument('-c', '--chunk-size', type=int,
+                        help='stream each file this many rows at a time instead of loading it whole, for ALEs too '
+                             'large to fit in memory')
+    parser.add_argument('-s', '--split', type=int, default=1,
+                        help='split each file\'s rows across this many processes when running the macro, for very '
+                             'large ALEs (default: %(default)s)')
+    parser.add_argument('-p', '--profile', action='store_true',
+                        help='report the time, rows, column change and peak memory of each action')
+    parser.add_argument('--profile-json', help='save the profile of each file to this JSON file')
+
+    args = parser.parse_args(arguments)
+
+    try:
+        macro_file, macro_name = resolve_macro(args.preset)
+
+    except ale_macro.AleMacroException as exception:
+        parser.error(exception.message)
+
+    ale_filenames = expand_inputs(args.inputs)
+
+    # load the preset once up front so a broken preset is reported before any work is queued
+    try:
+        ale_macro.cached_macro(macro_file)
+
+    except Exception as exception:
+        parser.error(f'{macro_file} could not be read: {type(exception).__name__}: {exception}')
+
+    start_time = time.perf_counter()
+    failed = 0
+    profiles = {}
+
+    results = batch_run(macro_file, ale_filenames, macro_name, args.output, args.workers, args.chunk_size,
+                        args.profile or bool(args.profile_json), args.split)
+
+    for ale_filename, output_file, seconds, messages, error, report in results:
+
+        if error:
+            failed += 1
+            print(f'FAILED {seconds:8.2f}s  {ale_filename}\n    {error}')
+
+        else:
+            print(f'OK     {seconds:8.2f}s  {ale_filename} -> {output_file}')
+
+        for message in messages:
+            print('    ' + message.replace('\n', '\n    '))
+
+        if report:
+            profiles[ale_filename] = report
+
+        if report and args.profile:
+            print('    ' + ale_macro.profile_summary(report).replace('\n', '\n    '))
+
+    if args.profile_json:
+        with open(args.profile_json, 'w') as file_handler:
+            json.dump(profiles, file_handler, indent=4)
+
+    print(f'\n{len(ale_filenames) - failed} of {len(ale_filenames)} files processed with {macro_name} in '
+          f'{time.perf_counter() - start_time:.2f}s')
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
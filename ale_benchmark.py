@@ -0,0 +1,260 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas
+
+import ale
+import ale_batch
+import ale_macro
+
+# columns every generated ALE has, covering the columns the shipped presets read - generated ALEs are padded out to
+# the requested width with numbered extra columns
+BASE_COLUMNS = ["Name", "Tape", "Start", "End", "Duration", "Resolution", "Camera", "Scene", "Take", "Shutter",
+                "Name_2", "Scene_2", "Shutter_2", "Episode Name", "Camera Serial #", "Source File Path", "ASC_SOP",
+                "ASC_SAT"]
+
+SOUND_COLUMNS = ["Tape", "Start", "End", "Sound Roll", "Slate", "Take", "Tracks", "Sample Rate"]
+
+RESOLUTIONS = ["4448 x 3096", "4096 x 2160", "3840 x 2160", "2880 x 2160", "1920 x 1080"]
+
+BENCHMARK_FPS = 24
+
+# a stage counts as a regression if it's this much slower than the baseline
+REGRESSION_TOLERANCE = 0.25
+
+
+def generate_ale(filename, rows, columns=len(BASE_COLUMNS), cardinality=50, osd=False, seed=0):
+    """writes a synthetic camera ALE of rows clips and at least columns columns - values are deterministic for a
+    seed, extra columns have cardinality distinct values, and osd writes the heading and sections with no blank
+    lines as OSD does"""
+
+    rng = random.Random(seed)
+
+    column_names = BASE_COLUMNS + [f'Column {number}' for number in range(1, columns - len(BASE_COLUMNS) + 1)]
+
+    tape_count = max(1, rows // 200)
+    frame = 0
+    data_lines = []
+
+    for clip in range(rows):
+
+        # clips are spread over the cards in shooting order, like a day's worth of camera rolls
+        tape = f'{chr(65 + clip % 4)}{clip * tape_count // rows + 1:03d}C{clip % 999 + 1:03d}'
+        duration = rng.randint(48, 4800)
+        frame += duration + rng.randint(0, 2400)
+        scene = rng.randint(1, 120)
+
+        row = [f'{tape}_{rng.randint(0, 99999):05d}', tape, _timecode(frame), _timecode(frame + duration),
+               _timecode(duration), rng.choice(RESOLUTIONS), chr(65 + clip % 4), f'{scene}{rng.choice("ABC")}',
+               str(rng.randint(1, 12)), rng.choice(["180", "172.8", "90"]), f'{scene}_{clip}', f'{scene}/{clip % 30}',
+               rng.choice(["180.0", "172.8"]), f'Episode {rng.randint(1, 10)}', f'SN{clip % 4:04d}',
+               f'/Volumes/{tape}/Clip/{tape}_{clip:06d}.mxf',
+               f'({rng.random():.4f} {rng.random():.4f} {rng.random():.4f})(0.0 0.0 0.0)(1.0 1.0 1.0)',
+               f'{rng.uniform(0.8, 1.2):.4f}']
+
+        row += [f'value {rng.randrange(cardinality)}' for _ in column_names[len(BASE_COLUMNS):]]
+
+        data_lines.append("\t".join(row) + "\t")
+
+    _write_ale(filename, column_names, data_lines, osd)
+
+
+def generate_ss_dr_pair(dr_filename, ss_filename, rows, overlap=0.8, columns=len(BASE_COLUMNS), cardinality=50,
+                        seed=0):
+    """writes a camera (DR) ALE and a sound (SS) ALE for an SS DR merge - overlap is the fraction of camera clips
+    that have a matching sound clip on Tape and Start, the sound ALE also has clips of its own that match nothing"""
+
+    generate_ale(dr_filename, rows, columns, cardinality, seed=seed)
+
+    rng = random.Random(seed + 1)
+    dr_ale_obj = ale.Ale(dr_filename, usecols=["Tape", "Start", "End", "Scene", "Take"])
+
+    data_lines = []
+
+    for tape, start, end, scene, take in dr_ale_obj.dataframe.itertuples(index=False):
+
+        if rng.random() < overlap:
+            data_lines.append(f'{tape}\t{start}\t{end}\tS{rng.randint(1, 40):03d}\t{scene}\t{take}\t1,2,3,4\t48000\t')
+
+    for clip in range(int(rows * (1 - overlap))):
+        start = _timecode(rng.randint(0, 2000000))
+        data_lines.append(f'WILD{clip:04d}\t{start}\t{start}\tS999\tWT\t1\t1,2\t48000\t')
+
+    _write_ale(ss_filename, SOUND_COLUMNS, data_lines, osd=False)
+
+
+def _write_ale(filename, column_names, data_lines, osd):
+
+    blank = [] if osd else [""]
+
+    lines = ["Heading", "FIELD_DELIM\tTABS", "VIDEO_FORMAT\t1080", "AUDIO_FORMAT\t48khz", f'FPS\t{BENCHMARK_FPS}']
+    lines += blank + ["Column", "\t".join(column_names) + "\t"] + blank + ["Data"] + data_lines
+
+    with open(filename, "w") as file_handler:
+        file_handler.write("\n".join(lines) + "\n")
+
+
+def _timecode(frame):
+    return (f'{frame // (BENCHMARK_FPS * 3600) % 24:02d}:{frame // (BENCHMARK_FPS * 60) % 60:02d}:'
+            f'{frame // BENCHMARK_FPS % 60:02d}:{frame % BENCHMARK_FPS:02d}')
+
+
+def time_stage(function, repeat=3, setup=None):
+    """runs function repeat times, returns the median wall time in seconds - setup is called before each run and
+    its result passed to function, so the time to copy inputs isn't counted"""
+
+    timings = []
+
+    for _ in range(repeat):
+        argument = setup() if setup else None
+
+        start_time = time.perf_counter()
+
+        if setup:
+            function(argument)
+        else:
+            function()
+
+        timings.append(time.perf_counter() - start_time)
+
+    return statistics.median(timings)
+
+
+def run_benchmarks(folder, rows=100000, columns=40, cardinality=50, overlap=0.8, repeat=3, seed=0):
+    """generates ALEs in folder and times each stage on them, returns a dictionary of stage: seconds"""
+
+    ale_file = os.path.join(folder, 'camera.ale')
+    osd_file = os.path.join(folder, 'camera_osd.ale')
+    dr_file = os.path.join(folder, 'dr.ale')
+    ss_file = os.path.join(folder, 'ss.ale')
+    output_file = os.path.join(folder, 'output.ale')
+
+    generate_ale(ale_file, rows, columns, cardinality, seed=seed)
+    generate_ale(osd_file, rows, columns, cardinality, osd=True, seed=seed)
+    generate_ss_dr_pair(dr_file, ss_file, rows, overlap, columns, cardinality, seed=seed)
+
+    loaded = ale.Ale(ale_file)
+    dr_ale_obj = ale.Ale(dr_file)
+    ss_ale_obj = ale.Ale(ss_file)
+
+    def copy_loaded():
+        ale_obj = ale.Ale()
+        ale_obj.heading = dict(loaded.heading)
+        ale_obj.dataframe = loaded.dataframe.copy()
+        return ale_obj
+
+    results = {
+        'load': time_stage(lambda: ale.Ale(ale_file), repeat),
+        'load_osd': time_stage(lambda: ale.Ale(osd_file), repeat),
+        'load_compact': time_stage(lambda: ale.Ale(ale_file, compact=True), repeat),
+        'set_column': time_stage(lambda ale_obj: ale_obj.set_column('Labroll', '{Tape}_{Scene}'), repeat,
+                                 copy_loaded),
+        'regex_column': time_stage(lambda ale_obj: ale_obj.regex_column('Resolution', r'^\d+'), repeat, copy_loaded),
+        'timecode_to_frame_number': time_stage(lambda ale_obj: ale_obj.timecode_to_frame_number('Start'), repeat,
+                                               copy_loaded),
+        'merge': time_stage(lambda: dr_ale_obj.merge(ss_ale_obj), repeat),
+        'append_multiple': time_stage(lambda: ale.append_multiple([loaded, dr_ale_obj, loaded]), repeat),
+        'to_file': time_stage(lambda: loaded.to_file(output_file), repeat),
+    }
+
+    preset_folder, macro_list = ale_macro.get_macros()
+
+    for macro_name in macro_list:
+
+        macro_file = os.path.join(preset_folder, f'{macro_name}.csv')
+
+        # end to end, as ale_batch runs it, loading and saving included
+        results[f'preset_{macro_name}'] = time_stage(lambda: _run_preset(ale_file, macro_file, output_file), repeat)
+
+    return results
+
+
+def _run_preset(ale_filename, macro_file, output_file):
+
+    result = ale_batch.run_file(ale_filename, macro_file, output_file)
+
+    if result[4]:
+        raise ale_macro.AleMacroException(result[4])
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """returns a list of (stage, baseline seconds, seconds) for the stages that are more than tolerance slower than
+    the baseline - stages missing from either are skipped"""
+
+    regressions = []
+
+    for stage, seconds in results.items():
+
+        baseline_seconds = baseline.get(stage)
+
+        if baseline_seconds and seconds > baseline_seconds * (1 + tolerance):
+            regressions.append((stage, baseline_seconds, seconds))
+
+    return regressions
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description='Time loading, macros, merging and saving on generated ALEs')
+
+    parser.add_argument('-r', '--rows', type=int, default=100000, help='clips per ALE (default: %(default)s)')
+    parser.add_argument('-c', '--columns', type=int, default=40, help='columns per ALE (default: %(default)s)')
+    parser.add_argument('--cardinality', type=int, default=50,
+                        help='distinct values in each extra column (default: %(default)s)')
+    parser.add_argument('--overlap', type=float, default=0.8,
+                        help='fraction of camera clips with matching sound clips (default: %(default)s)')
+    parser.add_argument('-n', '--repeat', type=int, default=3,
+                        help='runs per stage, the median is reported (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the generated ALEs (default: %(default)s)')
+    parser.add_argument('-o', '--output', help='save the results to this JSON file')
+    parser.add_argument('-b', '--baseline', help='compare against results saved with --output')
+    parser.add_argument('-t', '--tolerance', type=float, default=REGRESSION_TOLERANCE,
+                        help='fraction slower than the baseline that counts as a regression (default: %(default)s)')
+
+    args = parser.parse_args(arguments)
+
+    settings = {'rows': args.rows, 'columns': args.columns, 'cardinality': args.cardinality,
+                'overlap': args.overlap, 'repeat': args.repeat, 'seed': args.seed}
+
+    with tempfile.TemporaryDirectory() as folder:
+        results = run_benchmarks(folder, **settings)
+
+    for stage, seconds in results.items():
+        print(f'{stage:30} {seconds:8.3f}s')
+
+    if args.output:
+        report = {'version': ale.__version__, 'python': platform.python_version(), 'pandas': pandas.__version__,
+                  'settings': settings, 'results': results}
+
+        with open(args.output, 'w') as file_handler:
+            json.dump(report, file_handler, indent=4)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline, 'r') as file_handler:
+        baseline = json.load(file_handler)
+
+    if baseline.get('settings') != settings:
+        print(f'\nWarning: the baseline was run with different settings {baseline.get("settings")}')
+
+    regressions = compare(results, baseline['results'], args.tolerance)
+
+    for stage, baseline_seconds, seconds in regressions:
+        print(f'REGRESSION {stage}: {baseline_seconds:.3f}s -> {seconds:.3f}s')
+
+    if not regressions:
+        print(f'\nNo stages more than {args.tolerance:.0%} slower than {args.baseline}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,40 @@
 import ale
+import collections
+import concurrent.futures
+import contextlib
 import csv
+import json
+import logging
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+import pandas
+
+logger = logging.getLogger(__name__)
+
+# actions that only change the values in their column
+COLUMN_VALUE_ACTIONS = ('SET', 'REMATCH', 'RESUB', 'MAP')
+
+# actions that need every row of the ALE at once, so can't be run a chunk at a time by AleMacro.run_streaming -
+# all of the current actions only look at one row at a time
+WHOLE_TABLE_ACTIONS = ()
+
+# with workers, ALEs of at least this many rows are split into row partitions that are run on a process pool
+PARTITION_MIN_ROWS = 50000
+
+# the dataframe being partitioned - forked workers inherit it rather than having their partition pickled to them
+_partition_source = None
+
+# default naming for macro output files, e.g. A001.ale run with CDL is saved as A001_CDL.ale
+OUTPUT_PATTERN = '{stem}_{macro}{ext}'
+
+# parsed macro files, keyed by path, modification time and size, least recently used first
+MACRO_CACHE_SIZE = 64
+_macro_cache = collections.OrderedDict()
+_macro_cache_lock = threading.Lock()
 
 
 def run_action(ale_obj, action: [str]):
@@ -8,13 +43,29 @@ def run_action(ale_obj, action: [str]):
 
 class AleMacro:
 
-    def __init__(self, macro, ale_obj: ale.Ale = None, manager=None):
+    def __init__(self, macro, ale_obj: ale.Ale = None, manager=None, profile=None, workers=1):
 
-        """accepts filename or list of lists"""
+        """accepts filename or list of lists, pass a MacroProfile as profile to time each action. With more than one
+        worker, large ALEs are split into row partitions that are run on a process pool"""
 
         self.manager = manager
         self.ale_obj = ale_obj
-        self.action_list = compile_macro_list(macro)
+        self.profile = profile
+        self.workers = workers
+
+        # while streaming, each chunk would repeat the same messages, so they're only logged the first time
+        self.seen_messages = None
+
+        if isinstance(macro, str):
+            # macros loaded from file share their parsed actions and compiled plans through the macro cache
+            self.action_list, self.plans = cached_macro(macro)
+
+        else:
+            self.action_list = compile_macro_list(macro)
+            self.plans = {}
+
+        # the input columns the macro uses, None if it needs all of them
+        self.usecols = required_columns(self.action_list)
 
         # if an input ale object has been specified, execute actions on that ale object
         if self.ale_obj:
@@ -22,9 +73,27 @@ class AleMacro:
 
     def log(self, message):
 
+        if self.seen_messages is not None:
+            if str(message) in self.seen_messages:
+                return
+
+            self.seen_messages.add(str(message))
+
+        # messages a manager is showing are only logged at info level, so batch runs can silence them
         if self.manager:
             self.manager.log(message)
-        print(message)
+            logger.info(message)
+        else:
+            logger.warning(message)
+
+    def measure(self, stage, ale_obj, actions=None):
+
+        """returns a context manager that records the work done inside it in the macro's profile, if it has one"""
+
+        if self.profile is None:
+            return contextlib.nullcontext()
+
+        return self.profile.measure(stage, ale_obj, actions)
 
     def execute_actions(self, ale_obj=None):
 
@@ -33,42 +102,33 @@ class AleMacro:
         if ale_obj:
             self.ale_obj = ale_obj
 
-        print("Number of actions: " + str(len(self.action_list)))
-        for action in self.action_list:
-            print(action)
-
-        print()
-
-        for action in self.action_list:
-
-            try:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Number of actions: %d\n%s", len(self.action_list),
+                         "\n".join(str(action) for action in self.action_list))
 
-                if action[0] == 'RENAME':
-                    self.rename(action)
+        plan = self.compile(self.ale_obj.dataframe.columns)
 
-                elif action[0] == 'DELETE':
-                    self.delete(action)
+        # every invalid action is reported together, before anything runs
+        if plan.errors:
+            self.log("\n\n".join(plan.errors))
 
-                elif action[0] == 'REMATCH':
-                    self.re_match(action)
+        if (self.workers > 1 and len(self.ale_obj.dataframe) >= PARTITION_MIN_ROWS and
+                any(step[0][0] in COLUMN_VALUE_ACTIONS for step in plan.steps)):
+            self.execute_partitioned(plan.steps)
+            return
 
-                elif action[0] == 'RESUB':
-                    self.re_sub(action)
+        self.execute_steps(plan.steps)
 
-                elif action[0] == 'SET':
-                    self.set(action)
+    def execute_steps(self, steps):
 
-                elif action[0] == 'INCLUDE':
-                    self.include(action)
+        """execute steps of a compiled plan in order, logging the ones that fail"""
 
-                elif action[0] == 'HEADER':
-                    self.edit_header(action)
+        for step in steps:
 
-                elif action[0] == 'MAP':
-                    self.map(action)
+            try:
 
-                else:
-                    raise AleMacroException(f'{action[0]}: unrecognized macro action')
+                with self.measure(" ".join(step[0][:2]), self.ale_obj, step):
+                    self.execute_step(step)
 
             except AleMacroException as exception:
                 self.log(exception)
@@ -76,6 +136,134 @@ class AleMacro:
             except ale.AleException as exception:
                 self.log(exception)
 
+    def execute_step(self, step):
+
+        """execute a step of a compiled plan, a single action or a fused run of actions on one column"""
+
+        if len(step) == 1:
+            self.execute_action(step[0])
+
+        else:
+            self.execute_fused(step)
+
+    def execute_partitioned(self, steps):
+
+        """execute the steps of a compiled plan with the ALE split across the workers by row, then put the rows back
+        together in their original order - only the span from the first to the last column value action is split,
+        the steps either side of it (usually the closing INCLUDE) run once on the whole ALE. HEADER only changes the
+        heading, so it runs once here too. The RENAME, DELETE or INCLUDE steps inside the span run on every
+        partition, which gives the same result as running them once as they only look at the column list, which is
+        the same in every partition"""
+
+        value_positions = [position for position, step in enumerate(steps) if step[0][0] in COLUMN_VALUE_ACTIONS]
+        first, last = value_positions[0], value_positions[-1] + 1
+
+        data_steps = [step for step in steps[first:last] if step[0][0] != 'HEADER']
+
+        self.execute_steps(steps[:first])
+
+        with self.measure(f'{len(data_steps)} steps on {self.workers} workers', self.ale_obj, data_steps):
+            dataframe, messages = run_partitioned(self.ale_obj, data_steps, self.workers)
+            self.ale_obj.dataframe = dataframe
+
+        # each partition reports the same errors
+        for message in dict.fromkeys(messages):
+            self.log(message)
+
+        self.execute_steps([step for step in steps[first:last] if step[0][0] == 'HEADER'] + steps[last:])
+
+    def load(self, ale_filename, compact=False):
+
+        """loads an ALE to run the macro on, only parsing the columns the macro uses"""
+
+        ale_obj = ale.Ale(compact=compact)
+
+        with self.measure('load', ale_obj):
+            ale_obj.load_from_file(ale_filename, self.usecols)
+
+        return ale_obj
+
+    def save(self, ale_obj, output_filename):
+
+        """saves an ALE the macro has been run on"""
+
+        with self.measure('save', ale_obj):
+            ale_obj.to_file(output_filename)
+
+    def run_streaming(self, ale_filename, output_filename, chunk_size=ale.CHUNK_ROWS):
+
+        """runs the macro over an ALE file a chunk of rows at a time, writing each chunk to the output as it's done -
+        memory use is bounded by the chunk size rather than the size of the file"""
+
+        whole_table_actions = [action for action in self.action_list if action[0] in WHOLE_TABLE_ACTIONS]
+
+        if whole_table_actions:
+            raise AleMacroException('The following actions need the whole ALE and can\'t be streamed:\n' +
+                                    '\n'.join(str(action) for action in whole_table_actions))
+
+        self.seen_messages = set()
+
+        try:
+            with ale.AleWriter(output_filename) as writer:
+                for chunk in ale.iter_chunks(ale_filename, chunk_size, self.usecols):
+                    self.execute_actions(chunk)
+                    writer.write(chunk)
+
+        finally:
+            self.seen_messages = None
+
+    def compile(self, columns):
+
+        """returns the execution plan for an ALE with the given columns, plans are kept so the same macro can be run
+        over a batch of ALEs without recompiling"""
+
+        key = tuple(columns)
+
+        if key not in self.plans:
+            self.plans[key] = MacroPlan(self.action_list, columns)
+
+        return self.plans[key]
+
+    def execute_action(self, action):
+
+        """execute a single action on the macro's ale object"""
+
+        if action[0] == 'RENAME':
+            self.rename(action)
+
+        elif action[0] == 'DELETE':
+            self.delete(action)
+
+        elif action[0] == 'REMATCH':
+            self.re_match(action)
+
+        elif action[0] == 'RESUB':
+            self.re_sub(action)
+
+        elif action[0] == 'SET':
+            self.set(action)
+
+        elif action[0] == 'INCLUDE':
+            self.include(action)
+
+        elif action[0] == 'HEADER':
+            self.edit_header(action)
+
+        elif action[0] == 'MAP':
+            self.map(action)
+
+        else:
+            raise AleMacroException(f'{action[0]}: unrecognized macro action')
+
+    def execute_fused(self, actions):
+
+        """execute a run of SET, REMATCH, RESUB and MAP actions on the same column in one pass over the column"""
+
+        value = actions[0][2] if actions[0][0] == 'SET' else None
+        transforms = [column_transform(action) for action in actions if action[0] != 'SET']
+
+        self.ale_obj.transform_column(actions[0][1], transforms, value=value)
+
     def verify_macro_action(self, action: list, length: int):
 
         """test that the action is valid"""
@@ -132,7 +320,8 @@ class AleMacro:
 
     def edit_header(self, macro):
 
-        self.verify_macro_action(macro, 3)
+        if len(macro) != 3:
+            raise AleMacroException(f'{macro} is not a valid action')
 
         self.ale_obj.heading[macro[1]] = macro[2]
 
@@ -141,10 +330,360 @@ class AleMacro:
         if len(macro) < 3:
             raise AleMacroException(f'{macro} is not a valid action')
 
-        for map_key_value in macro[2:]:
-            map_from, map_to = map_key_value.split(':')
+        if macro[1] not in self.ale_obj.dataframe.columns:
+            raise AleMacroException(f'{macro}\n{macro[1]} is not in the dataframe')
+
+        self.ale_obj.transform_column(macro[1], [column_transform(macro)])
+
+
+class MessageCollector:
+
+    """stands in for the UI as a macro manager, keeping log messages so they can be reported later"""
+
+    def __init__(self):
+        self.messages = []
+
+    def log(self, message):
+        self.messages.append(str(message))
+
+
+class MacroPlan:
+
+    """an action list resolved against the columns of an input ALE - invalid actions are reported in errors and left
+    out, SET, REMATCH, RESUB and MAP actions whose output is never used are dropped, and runs of those actions on the
+    same column are fused into a single step. steps is a list of lists of actions"""
+
+    def __init__(self, action_list, columns):
+
+        self.errors = []
+        self.steps = []
+
+        valid_actions, final_columns = self.validate(action_list, list(columns))
+        live_actions = self.remove_dead_actions(valid_actions, final_columns)
+
+        for action in live_actions:
+
+            if self.steps and fusable(self.steps[-1], action):
+                self.steps[-1].append(action)
+            else:
+                self.steps.append([action])
+
+    def validate(self, action_list, columns):
+
+        """steps through the actions tracking which columns exist, returns the valid actions and the columns left at
+        the end - errors are collected rather than raised so they can all be reported at once"""
+
+        valid_actions = []
+
+        for action in action_list:
+
+            error = action_error(action, columns)
+
+            if error:
+                self.errors.append(error)
+                continue
+
+            valid_actions.append(action)
+
+            if action[0] == 'RENAME':
+                columns[columns.index(action[1])] = action[2]
+
+            elif action[0] == 'DELETE':
+                columns.remove(action[1])
+
+            elif action[0] == 'SET' and action[1] not in columns:
+                columns.append(action[1])
+
+            elif action[0] == 'INCLUDE':
+                columns = [column for column in action[1:] if column in columns]
+
+        return valid_actions, columns
+
+    @staticmethod
+    def remove_dead_actions(actions, final_columns):
+
+        """works backwards from the output columns, dropping SET, REMATCH, RESUB and MAP actions on columns that are
+        never read again and aren't in the output"""
+
+        live_columns = set(final_columns)
+        live_actions = []
+
+        for action in reversed(actions):
+
+            if action[0] in COLUMN_VALUE_ACTIONS and action[1] not in live_columns:
+                continue
+
+            if action[0] == 'SET':
+                live_columns.discard(action[1])
+                live_columns.update(tag for is_tag, tag in ale.compile_template(action[2]) if is_tag)
+
+            elif action[0] in ('RENAME', 'DELETE'):
+                # whether these columns exist changes what the action does, so anything producing them is still used
+                live_columns.update(action[1:3])
+
+            elif action[0] == 'INCLUDE':
+                live_columns = set(action[1:])
+
+            live_actions.append(action)
+
+        live_actions.reverse()
+
+        return live_actions
+
+
+class MacroProfile:
+
+    """records the wall time, rows, change in column count and peak memory of each action in a macro run, along with
+    loading and saving - pass one to AleMacro as profile. Functions added with subscribe are called with each record
+    as it's made, so a host can show progress. Memory is measured with tracemalloc, which slows everything down, so
+    it can be turned off with trace_memory"""
 
-            self.ale_obj.dataframe[macro[1]] = self.ale_obj.dataframe[macro[1]].str.replace(map_from, map_to)
+    def __init__(self, trace_memory=True):
+
+        self.trace_memory = trace_memory
+        self.records = []
+        self.callbacks = []
+
+        # only stop tracing afterwards if it was started here
+        self.started_tracing = False
+
+    def subscribe(self, callback):
+
+        self.callbacks.append(callback)
+
+    @contextlib.contextmanager
+    def measure(self, stage, ale_obj, actions=None):
+
+        """records the work done inside the with block, ale_obj is the ALE being worked on"""
+
+        columns_before = len(ale_obj.dataframe.columns)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            record = {'stage': stage,
+                      'actions': actions or [],
+                      'seconds': time.perf_counter() - start_time,
+                      'rows': len(ale_obj.dataframe),
+                      'columns_before': columns_before,
+                      'columns_after': len(ale_obj.dataframe.columns),
+                      'peak_memory_delta': None}
+
+            if self.trace_memory:
+                record['peak_memory_delta'] = tracemalloc.get_traced_memory()[1] - start_memory
+
+            self.records.append(record)
+
+            for callback in self.callbacks:
+                callback(record)
+
+    def close(self):
+
+        """stops memory tracing, if this profile started it"""
+
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def report(self):
+
+        """returns the records and the total time as a dictionary"""
+
+        return {'total_seconds': sum(record['seconds'] for record in self.records), 'records': list(self.records)}
+
+    def to_json(self):
+
+        return json.dumps(self.report(), indent=4)
+
+    def summary(self):
+
+        return profile_summary(self.report())
+
+
+def profile_summary(report):
+    """returns the records of a MacroProfile report as a table, slowest first"""
+
+    lines = []
+
+    for record in sorted(report['records'], key=lambda record: record['seconds'], reverse=True):
+
+        memory = '' if record['peak_memory_delta'] is None else f'{record["peak_memory_delta"] / 1048576:9.1f} MB'
+        column_change = record['columns_after'] - record['columns_before']
+
+        lines.append(f'{record["seconds"]:8.3f}s {record["rows"]:9} rows {column_change:+4} columns {memory}  '
+                     f'{record["stage"]}')
+
+    return "\n".join(lines)
+
+
+def run_partitioned(ale_obj, steps, workers):
+    """runs the steps of a compiled plan on row partitions of an ALE on a process pool, returns the resulting
+    dataframe and a list of the error messages from every partition - only the columns the steps write are sent back
+    from the workers, the rest are taken from the input"""
+
+    global _partition_source
+
+    source = ale_obj.dataframe
+    bounds = [(len(source) * number // workers, len(source) * (number + 1) // workers) for number in range(workers)]
+
+    context = ale.process_pool_context()
+
+    # forked workers read their partition from the parent's memory, spawned workers have their partition pickled to
+    # them
+    if context.get_start_method() == 'fork':
+        _partition_source = source
+        partitions = bounds
+
+    else:
+        partitions = [source.iloc[start:stop] for start, stop in bounds]
+
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            results = list(executor.map(_run_partition, [steps] * workers, [ale_obj.heading] * workers, partitions))
+
+    finally:
+        _partition_source = None
+
+    # every partition has the same columns, as they all started with the same columns and ran the same steps
+    origins = results[0][0]
+
+    dataframe = pandas.DataFrame({
+        column: source[origin] if origin else pandas.concat([result[1][column] for result in results])
+        for column, origin in origins.items()}, index=source.index)
+
+    return dataframe, [message for result in results for message in result[2]]
+
+
+def _run_partition(steps, heading, partition):
+    """runs steps on one partition, returns the partition's columns as a dictionary of column: the input column it
+    came from unchanged or None if it was written, the written columns, and any error messages"""
+
+    if isinstance(partition, tuple):
+        partition = _partition_source.iloc[partition[0]:partition[1]]
+
+    ale_obj = ale.Ale()
+    ale_obj.heading = dict(heading)
+    ale_obj.dataframe = partition.copy(deep=False)
+
+    collector = MessageCollector()
+
+    macro = AleMacro([], manager=collector)
+    macro.ale_obj = ale_obj
+
+    origins = {column: column for column in ale_obj.dataframe.columns}
+
+    for step in steps:
+        try:
+            macro.execute_step(step)
+
+        except (AleMacroException, ale.AleException) as exception:
+            macro.log(exception)
+            continue
+
+        if step[0][0] == 'RENAME':
+            origins[step[0][2]] = origins.pop(step[0][1])
+
+        elif step[0][0] in COLUMN_VALUE_ACTIONS:
+            origins[step[0][1]] = None
+
+    origins = {column: origins[column] for column in ale_obj.dataframe.columns}
+    written = {column: ale_obj.dataframe[column] for column, origin in origins.items() if origin is None}
+
+    return origins, written, collector.messages
+
+
+def action_error(action, columns):
+    """returns the reason an action can't run on an ALE with the given columns, or None if it's valid"""
+
+    action_type = action[0]
+
+    lengths = {'RENAME': 3, 'DELETE': 2, 'REMATCH': 3, 'RESUB': 4, 'SET': 3, 'HEADER': 3}
+    minimum_lengths = {'INCLUDE': 2, 'MAP': 3}
+
+    if action_type not in lengths and action_type not in minimum_lengths:
+        return f'{action_type}: unrecognized macro action'
+
+    if len(action) != lengths.get(action_type, len(action)) or len(action) < minimum_lengths.get(action_type, 0):
+        return f'{action} is not a valid action'
+
+    if action_type in ('RENAME', 'DELETE', 'REMATCH', 'RESUB', 'MAP') and action[1] not in columns:
+        return f'{action}\n{action[1]} is not in the dataframe'
+
+    if action_type == 'RENAME' and action[2] in columns:
+        return f'ALE Rename Column\n{action[2]} already in ALE, use SET instead'
+
+    if action_type == 'SET':
+        for is_tag, tag in ale.compile_template(action[2]):
+            if is_tag and tag not in columns:
+                return f"ALE Set Column\nDynamic tag {tag} isn't in the dataframe"
+
+    if action_type in ('REMATCH', 'RESUB'):
+        try:
+            ale.compile_regex(action[2])
+        except re.error as exception:
+            return f'{action}\n{action[2]} is not a valid regex: {exception}'
+
+    if action_type == 'MAP':
+        for map_key_value in action[2:]:
+            if map_key_value.count(':') != 1:
+                return f'{action}\n{map_key_value} is not a valid from:to mapping'
+
+    return None
+
+
+def required_columns(action_list):
+    """returns the set of input columns a macro names, or None if it needs every column - once a macro has an
+    INCLUDE, columns it never names can't reach the output or change what any of its actions do, so they don't need
+    to be loaded"""
+
+    if not any(action[0] == 'INCLUDE' and len(action) > 1 for action in action_list):
+        return None
+
+    columns = set()
+
+    for action in action_list:
+
+        if action[0] in ('INCLUDE', 'RENAME'):
+            columns.update(action[1:])
+
+        elif action[0] == 'SET' and len(action) == 3:
+            columns.add(action[1])
+            columns.update(tag for is_tag, tag in ale.compile_template(action[2]) if is_tag)
+
+        elif action[0] in ('DELETE', 'REMATCH', 'RESUB', 'MAP') and len(action) > 1:
+            columns.add(action[1])
+
+    return columns
+
+
+def fusable(step, action):
+    """whether an action can be fused onto the end of a step - a SET can only start a run, as it replaces the column"""
+
+    return (action[0] in ('REMATCH', 'RESUB', 'MAP') and step[0][0] in COLUMN_VALUE_ACTIONS and
+            step[0][1] == action[1])
+
+
+def column_transform(action):
+    """returns the Ale.transform_column transform for a REMATCH, RESUB or MAP action"""
+
+    if action[0] == 'REMATCH':
+        return ale.regex_transform(action[2])
+
+    elif action[0] == 'RESUB':
+        return ale.regex_transform(action[2], mode='replace', replace=action[3])
+
+    return ale.map_transform([map_key_value.split(':') for map_key_value in action[2:]])
 
 
 class AleMacroException(Exception):
@@ -161,7 +700,8 @@ def list_from_file(macro_file):
 
         reader = csv.reader(file_handler, delimiter=',')
 
-        next(reader)
+        # an empty file has no header row, and no actions
+        next(reader, None)
 
         for line in reader:
 
@@ -176,14 +716,87 @@ def list_from_file(macro_file):
     return action_list
 
 
+def cached_macro(macro_file):
+    """returns the parsed action list and the compiled plans dictionary for a macro file - these are cached, and the
+    file is only read again if its modification time or size has changed"""
+
+    file_stat = os.stat(macro_file)
+    key = (os.path.abspath(macro_file), file_stat.st_mtime_ns, file_stat.st_size)
+
+    with _macro_cache_lock:
+        if key in _macro_cache:
+            _macro_cache.move_to_end(key)
+            return _macro_cache[key]
+
+    cached = (list_from_file(macro_file), {})
+
+    with _macro_cache_lock:
+        _macro_cache[key] = cached
+
+        while len(_macro_cache) > MACRO_CACHE_SIZE:
+            _macro_cache.popitem(last=False)
+
+    return cached
+
+
+def prewarm_macros(macro_files):
+    """parses a list of macro files into the macro cache ahead of time, returns a list of (filename, exception) for
+    any that couldn't be read - a broken macro only fails when it's run, as it would without prewarming"""
+
+    errors = []
+
+    for macro_file in macro_files:
+        try:
+            cached_macro(macro_file)
+
+        except Exception as exception:
+            errors.append((macro_file, exception))
+
+    return errors
+
+
+def clear_macro_cache():
+    """empties the macro cache"""
+
+    with _macro_cache_lock:
+        _macro_cache.clear()
+
+
 def compile_macro_list(macro):
     if isinstance(macro, str):
-        return list_from_file(macro)
+        return cached_macro(macro)[0]
 
     elif isinstance(macro, list):
         return macro
 
 
+def get_macros():
+    macro_list = []
+
+    preset_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'presets')
+
+    for file in os.listdir(preset_folder):
+
+        if file.endswith('.csv'):
+            macro_list.append(file.replace('.csv', ''))
+
+    macro_list.sort()
+
+    return preset_folder, macro_list
+
+
+def output_filename(ale_filename, macro_name, pattern=OUTPUT_PATTERN):
+    """returns the filename to save a macro's output to - pattern can use {stem} (the input filename without its
+    extension), {macro} and {ext} (.ale or .ALE, matching the input), and is relative to the input's folder"""
+
+    stem, ext = os.path.splitext(os.path.basename(ale_filename))
+
+    if ext not in ('.ale', '.ALE'):
+        stem, ext = os.path.basename(ale_filename), '.ale'
+
+    return os.path.join(os.path.dirname(ale_filename), pattern.format(stem=stem, macro=macro_name, ext=ext))
+
+
 if __name__ == '__main__':
     test_ale = ale.Ale('AVID.ALE')
     AleMacro('presets/None.csv', test_ale)
@@ -1,23 +1,51 @@
 import os
+import queue
+import sys
+import threading
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import messagebox
 from tkinter import ttk
 
 import ale
+import ale_batch
 import ale_macro
 
+# number of processes used to parse ALEs when loading several at once, and to run macros on large ALEs
+LOAD_WORKERS = os.cpu_count() or 1
+
+# number of rows formatted into the preview at a time
+PREVIEW_ROWS = 200
+
+# how often the window checks for updates from the worker thread, in milliseconds
+UI_QUEUE_INTERVAL = 50
+
 
 class AleMacrosApp(tk.Tk):
 
     def __init__(self):
         super().__init__()
 
-        self.preset_folder, self.macro_list = get_macros()
+        self.preset_folder, self.macro_list = ale_macro.get_macros()
+
+        prewarm_errors = ale_macro.prewarm_macros([os.path.join(self.preset_folder, f'{name}.csv')
+                                                   for name in self.macro_list])
+
+        for macro_file, exception in prewarm_errors:
+            ale_macro.logger.warning('Could not read preset %s: %s: %s', macro_file, type(exception).__name__,
+                                     exception)
 
         self.setup_ui()
 
         self.loaded_ale = None
+        self.preview_start = 0
+
+        # jobs run on a worker thread, which sends anything that touches the window back through the UI queue
+        self.worker = None
+        self.cancel_event = threading.Event()
+        self.ui_queue = queue.Queue()
+
+        self.after(UI_QUEUE_INTERVAL, self.process_ui_queue)
 
     # noinspection PyAttributeOutsideInit
     def setup_ui(self):
@@ -71,6 +99,17 @@ class AleMacrosApp(tk.Tk):
         self.text_preview.grid(column=0, row=3, columnspan=4, sticky="NEW", pady=10, padx=10)
         self.text_preview['state'] = 'disabled'
 
+        # preview paging
+        self.btn_preview_previous = tk.Button(self, text="< Rows", command=lambda: self.page_preview(-1),
+                                              width=btn_width)
+        self.btn_preview_previous.grid(column=0, row=4, padx=5, pady=5)
+
+        self.btn_preview_next = tk.Button(self, text="Rows >", command=lambda: self.page_preview(1), width=btn_width)
+        self.btn_preview_next.grid(column=3, row=4, padx=5, pady=5)
+
+        self.text_preview.bind('<Prior>', lambda event: self.page_preview(-1))
+        self.text_preview.bind('<Next>', lambda event: self.page_preview(1))
+
         # ALE out
         self.btn_ale_out = tk.Button(self, text="Save ALE", command=self.ale_out, width=btn_width)
         self.btn_ale_out.grid(column=1, row=4, padx=5, pady=5)
@@ -79,22 +118,40 @@ class AleMacrosApp(tk.Tk):
         self.btn_csv_out = tk.Button(self, text="Save CSV", command=self.csv_out, width=btn_width)
         self.btn_csv_out.grid(column=2, row=4, padx=5, pady=5)
 
+        # progress
+        self.progress_bar = ttk.Progressbar(self, mode='determinate')
+        self.progress_bar.grid(column=0, row=5, columnspan=3, sticky="EW", padx=10)
+
+        # cancel
+        self.btn_cancel = tk.Button(self, text="Cancel", command=self.cancel, width=btn_width, state='disabled')
+        self.btn_cancel.grid(column=3, row=5, padx=5, pady=5)
+
+        # status
+        self.label_status = tk.Label(self, text="Ready", anchor="w")
+        self.label_status.grid(column=0, row=6, columnspan=4, sticky="EW", padx=10)
+
+        self.job_buttons = [self.btn_run, self.btn_batch_run, self.btn_batch_append, self.btn_ss_dr_merge,
+                            self.btn_ale_out, self.btn_csv_out]
+
     def get_current_macro_fname(self):
 
         preset_name = self.combo_macro.get()
 
         return os.path.join(self.preset_folder, f'{preset_name}.csv')
 
-    def run_current(self):
+    def run_current(self, ale_obj, macro_fname):
 
-        try:
-            macro = ale_macro.AleMacro(self.get_current_macro_fname(), self.loaded_ale, manager=self)
-        except ale_macro.AleMacroException as exception:
-            messagebox.showerror('AleMacroException', message=exception.message)
-        except ale.AleException as exception:
-            messagebox.showerror('AleException', message=exception.message)
-        else:
-            self.update_preview()
+        """runs a macro on an ALE object and shows the result - called on the worker thread"""
+
+        self.set_status(f'Running {os.path.basename(macro_fname)}')
+
+        # show each action in the status bar as it finishes
+        profile = ale_macro.MacroProfile(trace_memory=False)
+        profile.subscribe(lambda record: self.set_status(f'{record["stage"]} ({record["seconds"]:.2f}s)'))
+
+        ale_macro.AleMacro(macro_fname, ale_obj, manager=self, profile=profile, workers=LOAD_WORKERS)
+
+        self.call_on_ui(self.show_ale, ale_obj)
 
     def single_run(self):
 
@@ -103,8 +160,16 @@ class AleMacrosApp(tk.Tk):
         if not ale_filename:
             return
 
-        self.loaded_ale = ale.Ale(ale_filename)
-        self.run_current()
+        self.run_in_background(self.single_run_job, ale_filename, self.get_current_macro_fname())
+
+    def single_run_job(self, ale_filename, macro_fname):
+
+        self.set_status(f'Loading {os.path.basename(ale_filename)}')
+
+        ale_obj = ale_macro.AleMacro(macro_fname).load(ale_filename)
+
+        self.check_cancelled()
+        self.run_current(ale_obj, macro_fname)
 
     def batch_run(self):
 
@@ -113,25 +178,28 @@ class AleMacrosApp(tk.Tk):
         if not ale_filenames:
             return
 
-        for ale_filename in ale_filenames:
-            self.loaded_ale = ale.Ale(ale_filename)
-            self.run_current()
+        self.run_in_background(self.batch_run_job, ale_filenames, self.get_current_macro_fname(),
+                               self.combo_macro.get())
+
+    def batch_run_job(self, ale_filenames, macro_fname, macro_name):
 
-            new_file_name = self.loaded_ale.filename
-            macro_name = self.combo_macro.get()
+        failed = []
 
-            if new_file_name.endswith('.ale'):
-                new_file_name = new_file_name.replace('.ale', f'_{macro_name}.ale')
+        results = ale_batch.batch_run(macro_fname, ale_filenames, macro_name, workers=LOAD_WORKERS)
 
-            elif new_file_name.endswith('.ALE'):
-                new_file_name = new_file_name.replace('.ALE', f'_{macro_name}.ALE')
+        for done, (ale_filename, output_file, seconds, messages, error, report) in enumerate(results, start=1):
 
+            if error:
+                failed.append(f'{os.path.basename(ale_filename)}: {error}')
             else:
-                new_file_name = new_file_name + f'_{macro_name}.ale'
+                print(f'Saved {output_file}')
 
-            self.loaded_ale.to_file(new_file_name)
+            self.set_progress(done, len(ale_filenames), f'Batch run {done}/{len(ale_filenames)}: '
+                                                        f'{os.path.basename(ale_filename)} ({seconds:.2f}s)')
+            self.check_cancelled()
 
-            print(f'Saved {new_file_name}')
+        if failed:
+            self.log('The following ALEs failed:\n' + '\n'.join(failed))
 
     def batch_append(self):
 
@@ -140,15 +208,25 @@ class AleMacrosApp(tk.Tk):
         if not ale_filenames:
             return
 
-        ale_objects = ale.load_list(ale_filenames)
+        self.run_in_background(self.batch_append_job, ale_filenames, self.get_current_macro_fname())
+
+    def batch_append_job(self, ale_filenames, macro_fname):
+
+        ale_objects = self.load_with_progress(ale_filenames)
+
+        self.set_status('Appending')
 
-        errors = ale.append_multiple(ale_objects, return_errors=True)
+        ale_obj, errors, heading_conflicts = ale.append_multiple(ale_objects, return_errors=True)
 
         if errors:
             self.log('The following columns are only present in some ALEs:\n' + '\n'.join(errors))
 
-        self.loaded_ale = ale.append_multiple(ale_objects)
-        self.run_current()
+        if heading_conflicts:
+            self.log('The following heading values differ between ALEs:\n' +
+                     '\n'.join(f'{key}: {", ".join(values)}' for key, values in heading_conflicts.items()))
+
+        self.check_cancelled()
+        self.run_current(ale_obj, macro_fname)
 
     def ss_dr_merge(self):
 
@@ -161,22 +239,163 @@ class AleMacrosApp(tk.Tk):
         ss_folder = os.path.join(folder_name, 'SS')
 
         try:
-            dr_ale_obj = ale.append_multiple(ale.load_folder(dr_folder))
-            ss_ale_obj = ale.append_multiple(ale.load_folder(ss_folder))
+            dr_filenames = ale.list_folder(dr_folder)
+            ss_filenames = ale.list_folder(ss_folder)
 
         except FileNotFoundError:
             messagebox.showerror('Error', message="No valid folder structure found. ALEs should be placed in their "
                                                   "respective SS and DR folders")
             return
 
-        errors = dr_ale_obj.merge(ss_ale_obj, return_errors=True)
+        self.run_in_background(self.ss_dr_merge_job, dr_filenames, ss_filenames, self.get_current_macro_fname())
+
+    def ss_dr_merge_job(self, dr_filenames, ss_filenames, macro_fname):
+
+        dr_ale_obj = ale.append_multiple(self.load_with_progress(dr_filenames, 'DR'))
+        ss_ale_obj = ale.append_multiple(self.load_with_progress(ss_filenames, 'SS'))
+
+        self.set_status('Merging')
+
+        ale_obj, left_only, right_only, duplicate_columns, duplicate_keys = dr_ale_obj.merge(
+            ss_ale_obj, return_errors=True)
+
+        if left_only or right_only:
+            self.log('The following clips have no matches:\n' + '\n'.join(left_only + right_only))
+
+        if duplicate_keys:
+            self.log('The following clips appear more than once:\n' + '\n'.join(duplicate_keys))
+
+        self.check_cancelled()
+        self.run_current(ale_obj, macro_fname)
+
+    def load_with_progress(self, ale_filenames, description='Loading'):
+
+        """loads a list of ALEs on the worker thread, reporting progress as each one finishes - returns the ALE
+        objects in the order given, and logs any files that failed to load"""
+
+        loaded = {}
+        failed = []
+
+        for done, (ale_filename, ale_obj, exception) in enumerate(ale.iter_load_list(ale_filenames, LOAD_WORKERS),
+                                                                  start=1):
+            if exception is None:
+                loaded[ale_filename] = ale_obj
+            else:
+                failed.append(f'{os.path.basename(ale_filename)}: {exception}')
+
+            self.set_progress(done, len(ale_filenames), f'{description} {done}/{len(ale_filenames)}: '
+                                                        f'{os.path.basename(ale_filename)}')
+            self.check_cancelled()
+
+        if failed:
+            self.log('The following ALEs failed to load:\n' + '\n'.join(failed))
+
+        return [loaded[ale_filename] for ale_filename in ale_filenames if ale_filename in loaded]
+
+    def run_in_background(self, job, *args):
+
+        """runs job(*args) on a worker thread so the window stays responsive - only one job runs at a time"""
+
+        if self.worker and self.worker.is_alive():
+            messagebox.showerror('Busy', 'Please wait for the current job to finish, or cancel it')
+            return
+
+        self.cancel_event.clear()
+        self.set_busy(True)
+
+        self.worker = threading.Thread(target=self.run_job, args=(job, args), daemon=True)
+        self.worker.start()
+
+    def run_job(self, job, args):
+
+        try:
+            job(*args)
+
+        except JobCancelled:
+            self.set_status('Cancelled')
+
+        except ale_macro.AleMacroException as exception:
+            self.call_on_ui(messagebox.showerror, 'AleMacroException', exception.message)
+            self.set_status('Failed')
+
+        except ale.AleException as exception:
+            self.call_on_ui(messagebox.showerror, 'AleException', exception.message)
+            self.set_status('Failed')
+
+        except Exception as exception:
+            self.call_on_ui(messagebox.showerror, 'Error', str(exception))
+            self.set_status('Failed')
+
+        else:
+            self.set_status('Done')
+
+        finally:
+            self.call_on_ui(self.set_busy, False)
+
+    def check_cancelled(self):
+
+        """called by jobs between steps, stops the job if cancel has been pressed"""
+
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+
+        self.cancel_event.set()
+        self.label_status['text'] = 'Cancelling...'
+
+    def set_busy(self, busy):
+
+        for button in self.job_buttons:
+            button['state'] = 'disabled' if busy else 'normal'
 
-        if len(errors[1]) or len(errors[2]):
-            self.log('The following clips have no matches:\n' + '\n'.join(errors[1]) + '\n'.join(errors[2]))
+        self.btn_cancel['state'] = 'normal' if busy else 'disabled'
 
-        self.loaded_ale = dr_ale_obj.merge(ss_ale_obj)
+        if busy:
+            self.progress_bar['value'] = 0
 
-        self.run_current()
+    def set_status(self, text):
+
+        self.call_on_ui(self.label_status.configure, text=text)
+
+    def set_progress(self, value, maximum, text):
+
+        self.call_on_ui(self.progress_bar.configure, value=value, maximum=maximum)
+        self.set_status(text)
+
+    def call_on_ui(self, function, *args, **kwargs):
+
+        """queues a call to run on the main thread, tkinter widgets must only be touched from there"""
+
+        self.ui_queue.put((function, args, kwargs))
+
+    def process_ui_queue(self):
+
+        try:
+            while True:
+                try:
+                    function, args, kwargs = self.ui_queue.get_nowait()
+
+                except queue.Empty:
+                    break
+
+                # a failing call is reported and skipped, so the calls queued after it (like re-enabling the buttons
+                # when a job ends) still run
+                try:
+                    function(*args, **kwargs)
+
+                except Exception as exception:
+                    self.report_callback_exception(*sys.exc_info())
+                    self.label_status.configure(text=f'Error: {exception}')
+
+        finally:
+            self.after(UI_QUEUE_INTERVAL, self.process_ui_queue)
+
+    def show_ale(self, ale_obj):
+
+        self.loaded_ale = ale_obj
+        self.preview_start = 0
+        self.update_preview()
 
     def ale_out(self):
 
@@ -204,32 +423,44 @@ class AleMacrosApp(tk.Tk):
 
     def update_preview(self):
 
+        """shows the current page of rows of the loaded ALE, only those rows are formatted"""
+
+        preview_text = ''
+
+        if self.loaded_ale:
+            row_count = len(self.loaded_ale.dataframe)
+            last_row = min(self.preview_start + PREVIEW_ROWS, row_count)
+
+            preview_text = f'Rows {min(self.preview_start + 1, row_count)}-{last_row} of {row_count}\n\n'
+            preview_text += self.loaded_ale.preview(start_row=self.preview_start, max_rows=PREVIEW_ROWS)
+
         self.text_preview['state'] = 'normal'
         self.text_preview.delete(0.0, 'end')
-        self.text_preview.insert(0.0, str(self.loaded_ale))
+        self.text_preview.insert(0.0, preview_text)
         self.text_preview['state'] = 'disabled'
-        self.update()
 
-    def log(self, message):
-        messagebox.showinfo("ALE Macro Log", message)
+    def page_preview(self, pages):
 
-    def alert(self, message):
-        messagebox.showerror("ALERT - ALE Macro Error", message)
+        if not self.loaded_ale:
+            return 'break'
 
+        last_page_start = max(len(self.loaded_ale.dataframe) - 1, 0) // PREVIEW_ROWS * PREVIEW_ROWS
 
-def get_macros():
-    macro_list = []
+        self.preview_start = min(max(self.preview_start + pages * PREVIEW_ROWS, 0), last_page_start)
+        self.update_preview()
 
-    preset_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'presets')
+        # stop the text widget also handling the key
+        return 'break'
 
-    for file in os.listdir(preset_folder):
+    def log(self, message):
+        self.call_on_ui(messagebox.showinfo, "ALE Macro Log", message)
 
-        if file.endswith('.csv'):
-            macro_list.append(file.replace('.csv', ''))
+    def alert(self, message):
+        self.call_on_ui(messagebox.showerror, "ALERT - ALE Macro Error", message)
 
-    macro_list.sort()
 
-    return preset_folder, macro_list
+class JobCancelled(Exception):
+    pass
 
 
 if __name__ == '__main__':
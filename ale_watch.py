@@ -0,0 +1,240 @@
+import argparse
+import os
+import sys
+import time
+
+import ale
+import ale_batch
+import ale_macro
+
+
+class AleWatcher:
+
+    """watches the DR and SS folders of a shoot folder, keeping their ALEs in memory and only parsing files that are
+    new or have changed - whenever anything changes, the SS DR merge and macro are rerun and the output is rewritten.
+    The ALEs of each folder are kept appended together in filename order - new files that sort after the ones already
+    appended are added to the end, and a folder is only re-appended from scratch when a file sorts before them, or
+    one of its files changes or is removed, so the same folder contents always give the same output"""
+
+    def __init__(self, folder_name, macro_file, output_file, match_on=None, workers=1):
+
+        self.folder_name = folder_name
+        self.macro_file = macro_file
+        self.output_file = output_file
+        self.match_on = match_on
+        self.workers = workers
+
+        # per subfolder, filename: loaded ALE object
+        self.loaded = {'DR': {}, 'SS': {}}
+
+        # per subfolder, the loaded ALEs appended together, or None if it needs rebuilding - the files appended to it
+        # in order, and the files loaded since it was last appended to
+        self.combined = {'DR': None, 'SS': None}
+        self.combined_files = {'DR': [], 'SS': []}
+        self.new_files = {'DR': [], 'SS': []}
+
+        # set when writing the output fails, so it's retried on the next poll
+        self.output_failed = False
+
+        # filename: (mtime, size) when it was loaded, or when it was last seen if it hasn't settled yet
+        self.loaded_stats = {}
+        self.pending_stats = {}
+
+    def log(self, message):
+
+        print(f'{time.strftime("%H:%M:%S")}  {message}')
+
+    def poll(self):
+
+        """checks both folders once, returns True if the output was rewritten"""
+
+        changed = [self.scan(subfolder) for subfolder in self.loaded]
+
+        if not any(changed) and not self.output_failed:
+            return False
+
+        if not self.loaded['DR'] or not self.loaded['SS']:
+            self.log('Waiting for ALEs in both the DR and SS folders')
+            return False
+
+        self.output_failed = True
+        self.write_output()
+        self.output_failed = False
+
+        return True
+
+    def scan(self, subfolder):
+
+        """loads new or changed ALEs in a subfolder and forgets removed ones, returns True if anything changed - a
+        file is only loaded once its size and modification time are the same on two polls in a row, so files that
+        are still being copied in aren't read half written"""
+
+        folder = os.path.join(self.folder_name, subfolder)
+        loaded = self.loaded[subfolder]
+
+        current_stats = {}
+
+        if os.path.isdir(folder):
+            for file_name in sorted(os.listdir(folder)):
+
+                if file_name.endswith('.ale') or file_name.endswith('.ALE'):
+                    try:
+                        file_stat = os.stat(os.path.join(folder, file_name))
+
+                    except FileNotFoundError:
+                        # renamed or removed since it was listed, e.g. by a copy tool finishing a temporary file
+                        continue
+
+                    current_stats[os.path.join(folder, file_name)] = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        removed = [ale_file for ale_file in self.loaded_stats
+                   if os.path.dirname(ale_file) == folder and ale_file not in current_stats]
+
+        for ale_file in removed:
+            del self.loaded_stats[ale_file]
+
+            if loaded.pop(ale_file, None):
+                self.combined[subfolder] = None
+                self.log(f'Removed {ale_file}')
+
+        to_load = []
+
+        for ale_file, file_stat in current_stats.items():
+
+            if self.loaded_stats.get(ale_file) == file_stat:
+                continue
+
+            if self.pending_stats.get(ale_file) == file_stat:
+                to_load.append(ale_file)
+            else:
+                self.pending_stats[ale_file] = file_stat
+
+        for ale_file in list(self.pending_stats):
+            if os.path.dirname(ale_file) == folder and ale_file not in current_stats:
+                del self.pending_stats[ale_file]
+
+        ale_list, load_errors = ale.load_list(to_load, workers=self.workers, return_errors=True)
+
+        for ale_obj in ale_list:
+
+            # a changed file has to replace its rows, not be appended again
+            if ale_obj.filename in loaded:
+                self.combined[subfolder] = None
+
+            loaded[ale_obj.filename] = ale_obj
+            self.new_files[subfolder].append(ale_obj.filename)
+            self.loaded_stats[ale_obj.filename] = self.pending_stats.pop(ale_obj.filename)
+            self.log(f'Loaded {ale_obj.filename}')
+
+        for ale_file, exception in load_errors:
+            # remember its stats so it's only retried once it changes again
+            del self.pending_stats[ale_file]
+            self.loaded_stats[ale_file] = current_stats[ale_file]
+            self.log(f'Failed to load {ale_file}\n{exception}')
+
+        return bool(removed or ale_list)
+
+    def combined_ale(self, subfolder):
+
+        """returns the loaded ALEs of a subfolder appended together in filename order, appending only the files loaded
+        since the last call if they sort after the ones already appended"""
+
+        loaded = self.loaded[subfolder]
+        new_files = sorted(self.new_files[subfolder])
+        combined_files = self.combined_files[subfolder]
+
+        if self.combined[subfolder] is None or (new_files and combined_files and new_files[0] < combined_files[-1]):
+            self.combined_files[subfolder] = sorted(loaded)
+            self.combined[subfolder] = ale.append_multiple([loaded[ale_file] for ale_file in sorted(loaded)])
+
+        elif new_files:
+            self.combined_files[subfolder] = combined_files + new_files
+            self.combined[subfolder] = ale.append_multiple(
+                [self.combined[subfolder]] + [loaded[ale_file] for ale_file in new_files])
+
+        self.new_files[subfolder] = []
+
+        return self.combined[subfolder]
+
+    def write_output(self):
+
+        """merges the in memory DR and SS ALEs, runs the macro and saves the output"""
+
+        start_time = time.perf_counter()
+
+        dr_ale_obj = self.combined_ale('DR')
+        ss_ale_obj = self.combined_ale('SS')
+
+        try:
+            merged_ale, left_only, right_only, duplicate_columns, duplicate_keys = dr_ale_obj.merge(
+                ss_ale_obj, match_on=self.match_on, return_errors=True)
+
+        except ale.AleException as exception:
+            self.log(exception)
+            return
+
+        if left_only or right_only:
+            self.log(f'{len(left_only) + len(right_only)} clips have no matches')
+
+        if duplicate_keys:
+            self.log(f'{len(duplicate_keys)} clips appear more than once')
+
+        ale_macro.AleMacro(self.macro_file, merged_ale, manager=self)
+
+        merged_ale.to_file(self.output_file)
+
+        self.log(f'Saved {self.output_file} ({len(merged_ale.dataframe)} clips from {len(self.loaded["DR"])} DR and '
+                 f'{len(self.loaded["SS"])} SS ALEs) in {time.perf_counter() - start_time:.2f}s')
+
+    def run(self, interval=5.0):
+
+        """polls the folders until interrupted"""
+
+        self.log(f'Watching {self.folder_name}')
+
+        try:
+            while True:
+                try:
+                    self.poll()
+
+                # a file that can't be read or written, or a preset that's gone, shouldn't stop the watch for the
+                # rest of the day - the output is retried on the next poll
+                except Exception as exception:
+                    self.log(f'{type(exception).__name__}: {exception}')
+
+                time.sleep(interval)
+
+        except KeyboardInterrupt:
+            self.log('Stopped')
+
+
+def main(arguments=None):
+
+    parser = argparse.ArgumentParser(description='Watch a folder with DR and SS subfolders, merging and running a '
+                                                 'macro preset each time ALEs are added or changed')
+
+    parser.add_argument('folder', help='folder containing the DR and SS folders')
+    parser.add_argument('preset', help='preset name from the presets folder, or a path to a macro CSV')
+    parser.add_argument('-o', '--output', help='output ALE (default: merged_<preset>.ale in the watched folder)')
+    parser.add_argument('-i', '--interval', type=float, default=5.0,
+                        help='seconds between checks for new files (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='number of files to parse at once when several arrive together (default: %(default)s)')
+
+    args = parser.parse_args(arguments)
+
+    try:
+        macro_file, macro_name = ale_batch.resolve_macro(args.preset)
+
+    except ale_macro.AleMacroException as exception:
+        parser.error(exception.message)
+
+    output_file = args.output or os.path.join(args.folder, ale_macro.output_filename('merged.ale', macro_name))
+
+    AleWatcher(args.folder, macro_file, output_file, workers=args.workers).run(args.interval)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())